@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.utils.module_loading import autodiscover_modules
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        # Регистрируем задачи очереди из модулей tasks.py приложений
+        autodiscover_modules('tasks')
+        from .db import apply_sqlite_pragmas
+        connection_created.connect(apply_sqlite_pragmas)
@@ -0,0 +1,8 @@
+def percentile(values, share):
+    """Значение, ниже которого лежит доля share замеров (0.95 - p95).
+
+    Общая для команд замеров bench_urls и load_test.
+    """
+    values = sorted(values)
+    index = min(len(values) - 1, round(share * (len(values) - 1)))
+    return values[index]
@@ -0,0 +1,52 @@
+"""Основа для контекст-процессоров core.
+
+Контекст-процессоры вызываются при каждой отрисовке с RequestContext,
+даже если шаблон их переменные не выводит. Поэтому значения
+вычисляются лениво: lazy_context() кладёт в контекст объекты, которые
+считают значение при первом обращении шаблона. Значения, общие для
+всего процесса (год, настройки сайта), memoize() хранит заданное время.
+"""
+import threading
+import time
+from functools import partial, wraps
+
+from django.utils.functional import SimpleLazyObject
+
+
+def memoize(timeout):
+    """Кэширует результат функции без аргументов на timeout секунд.
+
+    Кэш свой у каждого процесса; сбросить его можно через .clear().
+    """
+    def decorator(func):
+        lock = threading.Lock()
+        cached = {}
+
+        @wraps(func)
+        def wrapper():
+            now = time.monotonic()
+            with lock:
+                if cached and cached['expires'] > now:
+                    return cached['value']
+            value = func()
+            with lock:
+                cached.update(value=value, expires=now + timeout)
+            return value
+
+        wrapper.clear = cached.clear
+        return wrapper
+    return decorator
+
+
+def lazy_context(**factories):
+    """Контекст-процессор из функций request -> значение.
+
+    Каждая функция вызывается не больше раза за отрисовку и только
+    если шаблон обратился к её переменной.
+    """
+    def processor(request):
+        return {
+            name: SimpleLazyObject(partial(factory, request))
+            for name, factory in factories.items()
+        }
+    return processor
@@ -1,12 +1,13 @@
 import datetime
 
+from . import lazy_context, memoize
 
-def year(request):
-    """Добавляет переменную с текущим годом."""
-    year = datetime.datetime.now().year
-    return {
-        'year': int(year)
-    }
 
+@memoize(timeout=60)
+def current_year():
+    """Текущий год; пересчитывается раз в минуту."""
+    return datetime.datetime.now().year
 
-print(year(datetime))
+
+# Добавляет переменную с текущим годом
+year = lazy_context(year=lambda request: current_year())
@@ -0,0 +1,80 @@
+import sqlite3
+import threading
+import types
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Выполняет PRAGMA из SQLITE_PRAGMAS на каждом новом соединении.
+
+    Обработчик сигнала connection_created. Постоянные соединения
+    (CONN_MAX_AGE) открываются редко, так что цена PRAGMA не важна.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+# Реплика, из которой читает текущий запрос, и была ли в нём запись
+_local = threading.local()
+
+
+@contextmanager
+def read_from(alias):
+    """Внутри блока чтение идёт из реплики alias (None - из основной базы).
+
+    Возвращает состояние, в котором отмечается, была ли запись.
+    """
+    state = types.SimpleNamespace(wrote=False)
+    previous = getattr(_local, 'state', None), getattr(_local, 'replica', None)
+    _local.state, _local.replica = state, alias
+    try:
+        yield state
+    finally:
+        _local.state, _local.replica = previous
+
+
+class ReplicaRouter:
+    """Чтение - в реплику, выбранную ReplicaMiddleware, запись - в default.
+
+    Вне запроса (команды, воркеры очереди) всё идёт в основную базу.
+    """
+
+    def db_for_read(self, model, **hints):
+        return getattr(_local, 'replica', None)
+
+    def db_for_write(self, model, **hints):
+        state = getattr(_local, 'state', None)
+        if state is not None:
+            state.wrote = True
+        # Без явного ответа Django писал бы туда, откуда объект прочитан
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # В репликах те же данные, что и в основной базе
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схема попадает в реплики вместе с данными
+        return db == DEFAULT_DB_ALIAS
+
+
+def copy_sqlite(source, path):
+    """Копирует базу SQLite из соединения source в файл path.
+
+    Замена репликации для локального запуска: читатели реплики видят
+    либо старую копию, либо новую целиком.
+    """
+    target = sqlite3.connect(path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
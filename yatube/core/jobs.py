@@ -0,0 +1,130 @@
+import json
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger('core.jobs')
+
+# Зарегистрированные задачи: имя -> функция
+TASKS = {}
+
+
+def task(name):
+    """Регистрирует функцию как задачу очереди под именем name.
+
+    Аргументы задачи должны сериализоваться в JSON. Задача может быть
+    выполнена повторно (после сбоя воркера или ошибки), поэтому она
+    должна быть идемпотентной.
+    """
+    def decorator(func):
+        TASKS[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, key=None, delay=0, max_attempts=None, **payload):
+    """Ставит задачу в очередь в текущей транзакции.
+
+    Если задача с таким ключом уже есть, новая не ставится. При
+    JOBS_EAGER задача выполняется сразу - так её видят тесты.
+    """
+    if name not in TASKS:
+        raise KeyError(f'Неизвестная задача: {name}')
+    if settings.JOBS_EAGER:
+        TASKS[name](**payload)
+        return None
+    fields = {
+        'name': name,
+        'payload': json.dumps(payload),
+        'run_at': timezone.now() + timedelta(seconds=delay),
+        'max_attempts': max_attempts or settings.JOBS_MAX_ATTEMPTS,
+    }
+    if key is None:
+        return Job.objects.create(**fields)
+    job, _ = Job.objects.get_or_create(key=key, defaults=fields)
+    return job
+
+
+def claim_job():
+    """Забирает следующую готовую задачу или возвращает None.
+
+    Задача помечается выполняемой условным UPDATE: если её успел взять
+    другой воркер, UPDATE не затронет строк и берётся следующая.
+    """
+    while True:
+        now = timezone.now()
+        ready = Job.objects.filter(
+            Q(status=Job.QUEUED, run_at__lte=now)
+            | Q(status=Job.RUNNING, locked_until__lt=now)
+        ).order_by('run_at', 'pk')
+        job = ready.first()
+        if job is None:
+            return None
+        locked_until = now + timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+        claimed = Job.objects.filter(
+            pk=job.pk, status=job.status, attempts=job.attempts,
+        ).update(
+            status=Job.RUNNING,
+            locked_until=locked_until,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def run_job(job):
+    """Выполняет задачу; при ошибке откладывает повтор с растущей паузой."""
+    func = TASKS.get(job.name)
+    try:
+        if func is None:
+            raise KeyError(f'Неизвестная задача: {job.name}')
+        with transaction.atomic():
+            func(**json.loads(job.payload))
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            job.status = Job.FAILED
+            logger.error('Задача %s не выполнена:\n%s', job, job.last_error)
+        else:
+            job.status = Job.QUEUED
+            delay = settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)
+            job.run_at = timezone.now() + timedelta(seconds=delay)
+            logger.warning('Задача %s будет повторена через %s с',
+                           job, delay)
+    else:
+        job.status = Job.DONE
+    job.locked_until = None
+    job.save(update_fields=[
+        'status', 'run_at', 'locked_until', 'last_error', 'updated'])
+    return job.status == Job.DONE
+
+
+def run_pending(limit=None):
+    """Выполняет готовые задачи, пока они есть. Возвращает их число."""
+    done = 0
+    while limit is None or done < limit:
+        job = claim_job()
+        if job is None:
+            break
+        run_job(job)
+        done += 1
+    return done
+
+
+def purge_done(days):
+    """Удаляет выполненные задачи старше days дней.
+
+    До этого их ключи защищают от повторной постановки.
+    """
+    border = timezone.now() - timedelta(days=days)
+    deleted, _ = Job.objects.filter(
+        status=Job.DONE, updated__lt=border).delete()
+    return deleted
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.warmup import compile_templates
+
+
+class Command(BaseCommand):
+    help = ('Разбирает все шаблоны сайта и падает, если какой-то не '
+            'разбирается. Показывает время разбора на старте и время '
+            'повторного get_template(): с кэширующим загрузчиком это '
+            'поиск в его кэше. Время отрисовки команда не замеряет.')
+
+    def handle(self, *args, **options):
+        cold = compile_templates()
+        warm = {name: duration for name, duration, _ in compile_templates()}
+        self.stdout.write(
+            f'{"шаблон":<40}{"разбор мс":>12}{"получение мс":>14}')
+        for name, duration, error in cold:
+            line = (f'{name:<40}{duration * 1000:>12.2f}'
+                    f'{warm[name] * 1000:>14.2f}')
+            if error is not None:
+                line += f'  ошибка: {error}'
+            self.stdout.write(line)
+        parse_total = sum(duration for _, duration, _ in cold)
+        self.stdout.write(
+            f'всего: разбор {parse_total * 1000:.1f} мс, '
+            f'повторное получение {sum(warm.values()) * 1000:.1f} мс')
+        broken = [name for name, _, error in cold if error is not None]
+        if broken:
+            raise CommandError(
+                'Шаблоны с ошибками: ' + ', '.join(broken))
@@ -0,0 +1,164 @@
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.bench import percentile
+
+
+async def read_response(reader):
+    """Читает ответ HTTP/1.1; возвращает код и можно ли слать дальше."""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split(' ')[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip().lower()
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if not size:
+                break
+    else:
+        await reader.read()
+        return status, False
+    return status, headers.get('connection') != 'close'
+
+
+class LoadTest:
+    def __init__(self, url, total, concurrency, slow_clients):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.path = (parts.path or '/') + (
+            f'?{parts.query}' if parts.query else '')
+        self.remaining = total
+        self.concurrency = concurrency
+        self.slow_clients = slow_clients
+        self.latencies = []
+        self.errors = 0
+        self.finished = asyncio.Event()
+
+    def request(self):
+        return (
+            f'GET {self.path} HTTP/1.1\r\nHost: {self.host}\r\n'
+            f'Connection: keep-alive\r\n\r\n'
+        ).encode()
+
+    async def client(self):
+        """Клиент с keep-alive: запросы один за другим по соединению."""
+        reader = writer = None
+        while self.remaining > 0:
+            self.remaining -= 1
+            started = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(
+                        self.host, self.port)
+                writer.write(self.request())
+                await writer.drain()
+                status, keep_alive = await read_response(reader)
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                self.errors += 1
+                writer = None
+                continue
+            self.latencies.append((time.perf_counter() - started) * 1000)
+            if status >= 500:
+                self.errors += 1
+            if not keep_alive:
+                writer.close()
+                writer = None
+        if writer is not None:
+            writer.close()
+
+    async def slow_client(self):
+        """Медленный клиент: держит соединение, посылая заголовки
+        по байту в секунду, пока идёт замер."""
+        try:
+            _, writer = await asyncio.open_connection(self.host, self.port)
+        except OSError:
+            return
+        writer.write(f'GET {self.path} HTTP/1.1\r\nX-Slow: '.encode())
+        while not self.finished.is_set():
+            try:
+                writer.write(b'a')
+                await writer.drain()
+            except OSError:
+                break
+            try:
+                await asyncio.wait_for(self.finished.wait(), 1)
+            except asyncio.TimeoutError:
+                pass
+        writer.close()
+
+    async def run(self):
+        slow = [asyncio.ensure_future(self.slow_client())
+                for _ in range(self.slow_clients)]
+        # Даём медленным клиентам занять соединения до начала замера
+        await asyncio.sleep(0.5 if slow else 0)
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(self.client() for _ in range(self.concurrency)))
+        elapsed = time.perf_counter() - started
+        self.finished.set()
+        await asyncio.gather(*slow)
+        return elapsed
+
+
+class Command(BaseCommand):
+    help = ('Нагружает запущенный сервер параллельными keep-alive '
+            'клиентами и, по желанию, медленными клиентами. Так '
+            'сравниваются запуск через WSGI (gunicorn) и ASGI (uvicorn).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000/')
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument(
+            '--slow-clients', type=int, default=0,
+            help='Сколько соединений держат медленные клиенты')
+        parser.add_argument('--output', help='Куда сохранить итоги в JSON')
+        parser.add_argument(
+            '--baseline', help='JSON прошлого прогона для сравнения')
+
+    def handle(self, *args, **options):
+        if urlsplit(options['url']).scheme != 'http':
+            raise CommandError('Поддерживаются только адреса http://')
+        test = LoadTest(
+            options['url'], options['requests'],
+            max(options['concurrency'], 1), options['slow_clients'])
+        elapsed = asyncio.run(test.run())
+        if not test.latencies:
+            raise CommandError('Сервер не ответил ни на один запрос.')
+        result = {
+            'url': options['url'],
+            'requests': len(test.latencies),
+            'errors': test.errors,
+            'concurrency': options['concurrency'],
+            'slow_clients': options['slow_clients'],
+            'rps': round(len(test.latencies) / elapsed, 1),
+            'p50_ms': round(statistics.median(test.latencies), 2),
+            'p95_ms': round(percentile(test.latencies, 0.95), 2),
+        }
+        self.stdout.write(
+            f'запросов: {result["requests"]}, ошибок: {result["errors"]}, '
+            f'{result["rps"]} запр/с, p50 {result["p50_ms"]} мс, '
+            f'p95 {result["p95_ms"]} мс')
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)
+            self.stdout.write(
+                f'против {baseline["url"]}: '
+                f'{result["rps"] - baseline["rps"]:+.1f} запр/с, '
+                f'p95 {result["p95_ms"] - baseline["p95_ms"]:+.2f} мс')
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(result, file, ensure_ascii=False, indent=2)
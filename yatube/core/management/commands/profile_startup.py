@@ -0,0 +1,144 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Выполняется в отдельном процессе: импорт точки входа и первый запрос
+BOOT_SCRIPT = '''
+import json, sys, time
+from wsgiref.util import setup_testing_defaults
+started = time.perf_counter()
+module = __import__(sys.argv[1], fromlist=['application'])
+booted = time.perf_counter()
+application = getattr(module, 'wsgi_application', module.application)
+environ = {'PATH_INFO': sys.argv[2]}
+setup_testing_defaults(environ)
+status = []
+
+
+def start_response(code, headers, exc_info=None):
+    status.append(code)
+
+
+result = application(environ, start_response)
+b''.join(result)
+result.close()
+finished = time.perf_counter()
+print(json.dumps({
+    'status': int(status[0].split()[0]),
+    'boot_ms': (booted - started) * 1000,
+    'first_response_ms': (finished - booted) * 1000,
+}))
+'''
+
+
+def parse_importtime(text):
+    """Строки вывода python -X importtime: (модуль, своё время, общее) в мс."""
+    modules = []
+    for line in text.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append(
+            (name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000))
+    return modules
+
+
+def failure_reason(process):
+    """Последняя строка stderr упавшего запуска или его код возврата."""
+    lines = process.stderr.strip().splitlines()
+    return lines[-1] if lines else f'код возврата {process.returncode}'
+
+
+def compare_line(normal_ms, lean_ms):
+    """Итог сравнения, сформулированный по фактическим замерам."""
+    difference = normal_ms - lean_ms
+    if difference > 0:
+        verdict = f'быстрее на {difference:.1f} мс'
+    elif difference < 0:
+        verdict = f'медленнее на {-difference:.1f} мс'
+    else:
+        verdict = 'не отличается по времени'
+    return (f'облегчённый запуск {verdict} '
+            f'({normal_ms:.1f} -> {lean_ms:.1f})')
+
+
+class Command(BaseCommand):
+    help = ('Замеряет холодный старт воркера: импорт точки входа и первый '
+            'ответ, с разбивкой времени импорта по модулям и пакетам. '
+            'С --compare сравнивает обычный запуск с YATUBE_LEAN_BOOT=1.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--module', default='yatube.wsgi',
+            help='Точка входа: yatube.wsgi или yatube.asgi')
+        parser.add_argument(
+            '--path', default='/', help='Адрес первого запроса')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--top', type=int, default=20,
+            help='Сколько самых долгих модулей показать')
+        parser.add_argument('--lean', action='store_true',
+                            help='Замерять облегчённый запуск')
+        parser.add_argument('--compare', action='store_true',
+                            help='Замерять оба запуска и сравнить')
+
+    def handle(self, *args, **options):
+        modes = [False, True] if options['compare'] else [options['lean']]
+        results = {}
+        for lean in modes:
+            runs, importtime = self.measure(options, lean)
+            results[lean] = runs
+            title = 'облегчённый запуск' if lean else 'обычный запуск'
+            self.stdout.write(f'== {title}')
+            self.report_imports(importtime, options['top'])
+            self.stdout.write(
+                f'импорт точки входа: {runs["boot_ms"]:.1f} мс, первый '
+                f'ответ ({runs["status"]}): {runs["first_response_ms"]:.1f} '
+                f'мс, всего {runs["total_ms"]:.1f} мс')
+        if options['compare']:
+            self.stdout.write(compare_line(
+                results[False]['total_ms'], results[True]['total_ms']))
+
+    def measure(self, options, lean):
+        """Медианы нескольких холодных стартов и importtime последнего."""
+        env = dict(os.environ, YATUBE_LEAN_BOOT='1' if lean else '0')
+        runs = []
+        for _ in range(max(options['repeat'], 1)):
+            process = subprocess.run(
+                [sys.executable, '-X', 'importtime', '-c', BOOT_SCRIPT,
+                 options['module'], options['path']],
+                cwd=settings.BASE_DIR, env=env, capture_output=True,
+                text=True)
+            output = process.stdout.strip().splitlines()
+            if process.returncode or not output:
+                raise CommandError(
+                    f'Запуск {options["module"]} упал:\n'
+                    f'{failure_reason(process)}')
+            runs.append(json.loads(output[-1]))
+        summary = {
+            key: statistics.median(run[key] for run in runs)
+            for key in ('boot_ms', 'first_response_ms')
+        }
+        summary['total_ms'] = summary['boot_ms'] + summary['first_response_ms']
+        summary['status'] = runs[-1]['status']
+        return summary, parse_importtime(process.stderr)
+
+    def report_imports(self, modules, top):
+        packages = defaultdict(float)
+        for name, self_ms, _ in modules:
+            packages[name.split('.')[0]] += self_ms
+        self.stdout.write(f'{"модуль":<48}{"своё мс":>10}{"всего мс":>10}')
+        for name, self_ms, cumulative_ms in sorted(
+                modules, key=lambda module: -module[2])[:top]:
+            self.stdout.write(
+                f'{name:<48}{self_ms:>10.1f}{cumulative_ms:>10.1f}')
+        self.stdout.write(f'{"пакет":<48}{"своё мс":>10}')
+        for name, self_ms in sorted(
+                packages.items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write(f'{name:<48}{self_ms:>10.1f}')
@@ -0,0 +1,39 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.db import copy_sqlite
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в реплики DATABASE_REPLICAS. '
+            'Заменяет репликацию при локальном запуске с двумя файлами '
+            'базы (YATUBE_REPLICA_DB_PATHS).')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help='Пауза (с) между копиями - отставание реплик')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Скопировать один раз и выйти')
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError(
+                'Реплики не настроены: задайте YATUBE_REPLICA_DB_PATHS.')
+        source = connections['default']
+        if source.vendor != 'sqlite':
+            raise CommandError('Копировать можно только базу SQLite.')
+        while True:
+            source.ensure_connection()
+            for alias in settings.DATABASE_REPLICAS:
+                copy_sqlite(
+                    source.connection, connections.databases[alias]['NAME'])
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(
+            f'Скопировано в реплики: {len(settings.DATABASE_REPLICAS)}')
@@ -0,0 +1,68 @@
+import multiprocessing
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.jobs import purge_done, run_pending
+
+
+class Command(BaseCommand):
+    help = ('Запускает воркеры очереди задач (core.jobs). Очередь хранится '
+            'в базе сайта, отдельный брокер не нужен.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Сколько процессов-воркеров запустить')
+        parser.add_argument(
+            '--sleep', type=float, default=1.0,
+            help='Пауза (с), когда очередь пуста')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и выйти')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            done = run_pending()
+            self.stdout.write(f'Выполнено задач: {done}')
+            return
+        workers = max(options['workers'], 1)
+        if workers == 1:
+            self.work(options['sleep'])
+            return
+        # Соединения с базой не должны переходить в дочерние процессы
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=self.work,
+                                    args=(options['sleep'],))
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        # SIGTERM передаём воркерам: они доделают текущие задачи
+        signal.signal(signal.SIGTERM, lambda *args: [
+            process.terminate() for process in processes])
+        self.stdout.write(f'Запущено воркеров: {workers}')
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+                process.join()
+
+    def work(self, sleep):
+        stopping = []
+        # По SIGTERM дорабатываем текущую задачу и выходим
+        signal.signal(signal.SIGTERM, lambda *args: stopping.append(True))
+        purged = 0.0
+        while not stopping:
+            if run_pending(limit=100):
+                continue
+            if time.monotonic() - purged > 60 * 60:
+                purge_done(settings.JOBS_KEEP_DONE_DAYS)
+                purged = time.monotonic()
+            time.sleep(sleep)
@@ -0,0 +1,233 @@
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+
+# Границы корзин гистограмм: время запроса в секундах и число SQL
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+# Описание метрик: тип, подсказка и корзины для гистограмм
+METRICS = {
+    'yatube_requests_total': (
+        'counter', 'Обработанные запросы', None),
+    'yatube_request_duration_seconds': (
+        'histogram', 'Время обработки запроса', DURATION_BUCKETS),
+    'yatube_db_queries': (
+        'histogram', 'Число SQL-запросов на запрос', QUERY_BUCKETS),
+    'yatube_db_duration_seconds': (
+        'histogram', 'Время SQL-запросов на запрос', DURATION_BUCKETS),
+    'yatube_post_card_cache_hits_total': (
+        'counter', 'Попадания в кэш карточек постов', None),
+    'yatube_post_card_cache_misses_total': (
+        'counter', 'Промахи кэша карточек постов', None),
+    'yatube_feed_cache_hits_total': (
+        'counter', 'Попадания в кэш лент', None),
+    'yatube_feed_cache_misses_total': (
+        'counter', 'Промахи кэша лент', None),
+}
+
+# Доли попаданий: метрика -> (подсказка, попадания, промахи)
+HIT_RATIOS = {
+    'yatube_post_card_cache_hit_ratio': (
+        'Доля попаданий в кэш карточек постов',
+        'yatube_post_card_cache_hits_total',
+        'yatube_post_card_cache_misses_total'),
+    'yatube_feed_cache_hit_ratio': (
+        'Доля попаданий в кэш лент',
+        'yatube_feed_cache_hits_total',
+        'yatube_feed_cache_misses_total'),
+}
+
+
+def labels_key(labels):
+    return json.dumps(sorted(labels.items()), ensure_ascii=False)
+
+
+class MetricsStore:
+    """Метрики одного процесса.
+
+    Значения копятся в памяти и не чаще раза в METRICS_FLUSH_INTERVAL
+    секунд сбрасываются в файл процесса в METRICS_DIR. /metrics
+    складывает файлы всех процессов, поэтому воркеры gunicorn не
+    нужно ни связывать между собой, ни опрашивать по отдельности.
+    """
+
+    def __init__(self, pid=None):
+        self.pid = pid or os.getpid()
+        self.lock = threading.Lock()
+        self.values = {}
+        self.flushed = 0.0
+
+    def inc(self, name, labels, value=1):
+        key = labels_key(labels)
+        with self.lock:
+            series = self.values.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name, labels, value):
+        with self.lock:
+            self.values.setdefault(name, {})[labels_key(labels)] = value
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = labels_key(labels)
+        with self.lock:
+            series = self.values.setdefault(name, {})
+            histogram = series.setdefault(
+                key, {'buckets': [0] * len(buckets), 'sum': 0, 'count': 0})
+            for number, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram['buckets'][number] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    def flush(self, force=False):
+        now = time.monotonic()
+        if not force and now - self.flushed < settings.METRICS_FLUSH_INTERVAL:
+            return
+        with self.lock:
+            data = json.dumps(self.values)
+            self.flushed = now
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        path = os.path.join(settings.METRICS_DIR, f'{self.pid}.json')
+        # Через временный файл: читатель не увидит файл наполовину
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            file.write(data)
+        os.replace(temp_path, path)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Хранилище текущего процесса; после fork() создаётся заново."""
+    global _store
+    with _store_lock:
+        if _store is None or _store.pid != os.getpid():
+            _store = MetricsStore()
+        return _store
+
+
+def pid_alive(pid):
+    """Жив ли процесс pid (сигнал 0 только проверяет его наличие)."""
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def load_process_file(name):
+    """Метрики процесса из его файла или None.
+
+    Файл завершившегося процесса удаляется: иначе после каждого
+    перезапуска воркеров его значения складывались бы с живыми вечно.
+    """
+    try:
+        pid = int(name[:-len('.json')])
+    except ValueError:
+        return None
+    path = os.path.join(settings.METRICS_DIR, name)
+    if not pid_alive(pid):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return None
+    try:
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def merge_values(total, values):
+    """Добавляет метрики одного процесса к сумме."""
+    for metric, series in values.items():
+        merged = total.setdefault(metric, {})
+        for key, value in series.items():
+            if not isinstance(value, dict):
+                merged[key] = merged.get(key, 0) + value
+                continue
+            current = merged.setdefault(key, {
+                'buckets': [0] * len(value['buckets']),
+                'sum': 0, 'count': 0})
+            current['buckets'] = [
+                a + b for a, b in zip(current['buckets'], value['buckets'])]
+            current['sum'] += value['sum']
+            current['count'] += value['count']
+
+
+def collect():
+    """Сумма метрик из файлов всех процессов.
+
+    Файлы завершившихся процессов удаляются (load_process_file).
+    Счётчики при этом уменьшаются, и Prometheus примет это за сброс.
+    """
+    total = {}
+    try:
+        names = os.listdir(settings.METRICS_DIR)
+    except FileNotFoundError:
+        return total
+    for name in names:
+        if not name.endswith('.json'):
+            continue
+        values = load_process_file(name)
+        if values is not None:
+            merge_values(total, values)
+    return total
+
+
+def escape(value):
+    return (str(value).replace('\\', r'\\')
+            .replace('"', r'\"').replace('\n', r'\n'))
+
+
+def format_labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(
+        f'{name}="{escape(value)}"' for name, value in pairs) + '}'
+
+
+def render(total):
+    """Метрики в текстовом формате Prometheus."""
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for key, value in sorted(total.get(name, {}).items()):
+            pairs = json.loads(key)
+            if kind != 'histogram':
+                lines.append(f'{name}{format_labels(pairs)} {value}')
+                continue
+            # Корзины накопительные: observe() считает значение во
+            # всех корзинах, граница которых не меньше него
+            for bound, count in zip(buckets, value['buckets']):
+                lines.append(
+                    f'{name}_bucket{format_labels(pairs + [["le", bound]])}'
+                    f' {count}')
+            lines.append(
+                f'{name}_bucket{format_labels(pairs + [["le", "+Inf"]])}'
+                f' {value["count"]}')
+            lines.append(f'{name}_sum{format_labels(pairs)} {value["sum"]}')
+            lines.append(
+                f'{name}_count{format_labels(pairs)} {value["count"]}')
+
+    for name, (help_text, hits_name, misses_name) in HIT_RATIOS.items():
+        hits = sum(total.get(hits_name, {}).values())
+        misses = sum(total.get(misses_name, {}).values())
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} gauge')
+        ratio = hits / (hits + misses) if hits + misses else 0
+        lines.append(f'{name} {ratio}')
+    return '\n'.join(lines) + '\n'
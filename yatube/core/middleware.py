@@ -0,0 +1,250 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+
+from posts.feed_cache import card_cache_stats, feed_cache_stats
+
+from .db import read_from
+from .metrics import get_store
+from .staticfiles import find_static_file, serve_static
+
+logger = logging.getLogger('core.timing')
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RequestTiming:
+    """Счётчики одного запроса: SQL, шаблоны и общее время."""
+
+    def __init__(self):
+        self.queries = []
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Обёртка для connection.execute_wrapper()
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.sql_time += duration
+            self.queries.append((duration, sql))
+
+
+def timed_render(render):
+    """Оборачивает Template._render: время шаблонов запроса.
+
+    Замеры берутся из request в контексте шаблона, поэтому шаблоны вне
+    замеряемых запросов платят только за одну проверку атрибута.
+    """
+    def wrapper(self, context):
+        request = getattr(context, 'request', None)
+        timing = getattr(request, '_timing', None)
+        if timing is None:
+            return render(self, context)
+        # {% include %} и {% extends %} вызывают _render() вложенно:
+        # время считаем только у внешнего шаблона
+        timing.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            timing.template_depth -= 1
+            if not timing.template_depth:
+                timing.template_time += time.perf_counter() - started
+    wrapper.timed = True
+    return wrapper
+
+
+def install_template_timing():
+    """Включает замер шаблонов для всего процесса (один раз)."""
+    if not getattr(Template._render, 'timed', False):
+        Template._render = timed_render(Template._render)
+
+
+class TimingMiddleware:
+    """Замеряет число и время SQL-запросов, время шаблонов и
+    представления.
+
+    Результат уходит в заголовок Server-Timing и строкой JSON в логгер
+    core.timing для доли запросов REQUEST_TIMING_SAMPLE_RATE. Запрос
+    дольше REQUEST_TIMING_SLOW_MS попадает в лог всегда, вместе со
+    списком его SQL-запросов. Время шаблонов замеряется только при
+    REQUEST_TIMING_TEMPLATES: для этого оборачивается Template._render.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.templates = settings.REQUEST_TIMING_TEMPLATES
+        if self.templates:
+            install_template_timing()
+
+    def __call__(self, request):
+        # Замер идёт всегда, чтобы не пропустить медленный запрос;
+        # выборка решает только, писать ли обычную запись
+        sampled = random.random() < settings.REQUEST_TIMING_SAMPLE_RATE
+        timing = RequestTiming()
+        request._timing = timing
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timing))
+            response = self.get_response(request)
+        total = time.perf_counter() - started
+        if not sampled and total * 1000 < settings.REQUEST_TIMING_SLOW_MS:
+            return response
+
+        metrics = [
+            f'sql;dur={timing.sql_time * 1000:.1f};'
+            f'desc="{len(timing.queries)} queries"',
+            f'view;dur={total * 1000:.1f}',
+        ]
+        if self.templates:
+            metrics.insert(1, f'tpl;dur={timing.template_time * 1000:.1f}')
+        response['Server-Timing'] = ', '.join(metrics)
+        self.log(request, response, timing, total)
+        return response
+
+    def log(self, request, response, timing, total):
+        match = request.resolver_match
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'view_ms': round(total * 1000, 1),
+            'sql_ms': round(timing.sql_time * 1000, 1),
+            'sql_count': len(timing.queries),
+        }
+        if self.templates:
+            record['template_ms'] = round(timing.template_time * 1000, 1)
+        if total * 1000 < settings.REQUEST_TIMING_SLOW_MS:
+            logger.info(json.dumps(record, ensure_ascii=False))
+            return
+        record['queries'] = [
+            {'ms': round(duration * 1000, 2), 'sql': sql}
+            for duration, sql in sorted(timing.queries, reverse=True)
+        ]
+        logger.warning(json.dumps(record, ensure_ascii=False))
+
+
+class QueryCounter:
+    """Число и время SQL-запросов для connection.execute_wrapper()."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+class MetricsMiddleware:
+    """Копит метрики запросов для /metrics: счётчики и гистограммы
+    времени и числа SQL-запросов по представлениям."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        # Имя представления, как в шапке сайта; для 404 без маршрута
+        # отдельная метка, чтобы случайные URL не плодили ряды
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        store = get_store()
+        store.inc('yatube_requests_total', {
+            'view': view,
+            'method': request.method,
+            'status': response.status_code,
+        })
+        store.observe(
+            'yatube_request_duration_seconds', {'view': view}, duration)
+        store.observe('yatube_db_queries', {'view': view}, counter.count)
+        store.observe(
+            'yatube_db_duration_seconds', {'view': view}, counter.duration)
+        stats = card_cache_stats()
+        store.set('yatube_post_card_cache_hits_total', {}, stats['hits'])
+        store.set('yatube_post_card_cache_misses_total', {}, stats['misses'])
+        stats = feed_cache_stats()
+        store.set('yatube_feed_cache_hits_total', {}, stats['hits'])
+        store.set('yatube_feed_cache_misses_total', {}, stats['misses'])
+        store.flush()
+        return response
+
+
+class ReplicaMiddleware:
+    """Направляет чтение безопасных запросов в реплики DATABASE_REPLICAS.
+
+    Запрос, который что-то записал, ставит cookie REPLICA_STICKY_COOKIE:
+    пока она жива (REPLICA_STICKY_SECONDS), запросы этого клиента читают
+    из основной базы и видят свою запись, даже если реплика отстаёт.
+    Пути из REPLICA_PRIMARY_PATHS (админка) всегда идут в основную базу.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        replica = None
+        if (request.method in SAFE_METHODS
+                and settings.REPLICA_STICKY_COOKIE not in request.COOKIES
+                and not request.path.startswith(
+                    tuple(settings.REPLICA_PRIMARY_PATHS))):
+            replica = random.choice(settings.DATABASE_REPLICAS)
+        with read_from(replica) as state:
+            response = self.get_response(request)
+        if state.wrote:
+            response.set_cookie(
+                settings.REPLICA_STICKY_COOKIE, '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True, samesite='Lax')
+        return response
+
+
+class StaticFilesMiddleware:
+    """Отдаёт собранную статику из STATIC_ROOT без отдельного сервера.
+
+    Файлы с хэшем в имени кэшируются навсегда, остальные - ненадолго.
+    Готовые .br и .gz от collectstatic отдаются с Content-Encoding.
+    При DEBUG статику отдаёт runserver, и middleware отключается.
+    """
+
+    def __init__(self, get_response):
+        if settings.DEBUG or not settings.STATIC_ROOT:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        prefix = settings.STATIC_URL
+        if (request.method not in ('GET', 'HEAD')
+                or not request.path_info.startswith(prefix)):
+            return self.get_response(request)
+        path = find_static_file(
+            settings.STATIC_ROOT, request.path_info[len(prefix):])
+        if path is None:
+            return self.get_response(request)
+        return serve_static(request, path)
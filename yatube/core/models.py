@@ -0,0 +1,47 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Отложенная задача очереди (см. core/jobs.py).
+
+    Очередь живёт в той же базе, что и данные: задача ставится в одной
+    транзакции с записью, которая её породила, и исчезает при откате.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Не выполнена'),
+    )
+
+    name = models.CharField(max_length=100)
+    # Аргументы задачи в JSON
+    payload = models.TextField(default='{}')
+    # Ключ идемпотентности: задача с тем же ключом ставится один раз
+    key = models.CharField(max_length=200, unique=True, null=True,
+                           blank=True)
+    status = models.CharField(max_length=10, choices=STATUSES,
+                              default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    # Задачу, чей воркер упал, после этого времени берёт другой
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f'{self.name} #{self.pk} ({self.status})'
+
+    class Meta:
+        # Воркер выбирает следующую задачу по этому индексу
+        indexes = [
+            models.Index(fields=['status', 'run_at'],
+                         name='job_status_run_at_idx'),
+        ]
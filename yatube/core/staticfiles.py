@@ -0,0 +1,128 @@
+import gzip
+import mimetypes
+import os
+import re
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:
+    # Без пакета Brotli собираются только .gz
+    brotli = None
+
+# Что имеет смысл сжимать: картинки PNG и JPEG уже сжаты
+COMPRESSIBLE = ('.css', '.js', '.svg', '.ico', '.json', '.txt', '.xml',
+                '.html', '.map')
+
+
+def gzip_bytes(data):
+    # mtime=0: одинаковые файлы дают одинаковый архив при каждой сборке
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def brotli_bytes(data):
+    return brotli.compress(data, quality=11)
+
+
+# Расширение сжатого файла и функция сжатия, в порядке предпочтения
+ENCODINGS = [('br', '.br', brotli_bytes)] if brotli else []
+ENCODINGS.append(('gzip', '.gz', gzip_bytes))
+# Готовые копии отдаются, даже если здесь нет пакета Brotli
+SERVED_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# Имя с хэшем содержимого от ManifestStaticFilesStorage: logo.0f2c1e9a8b7d.png
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Файлы без хэша в имени могут поменяться при следующей сборке
+REVALIDATE = 'public, max-age=60'
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Статика с хэшем содержимого в имени и готовыми .gz и .br рядом.
+
+    Сжатые копии собирает collectstatic, так что при запросе сжимать
+    нечего. Копия сохраняется, только если она меньше исходного файла.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed_names = set()
+        for name, hashed_name, processed in super().post_process(
+                paths, dry_run, **options):
+            if hashed_name:
+                hashed_names.add(hashed_name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        # Шаблоны ссылаются только на имена с хэшем: сжимаем их
+        for name in hashed_names:
+            if name.endswith(COMPRESSIBLE):
+                self.compress(name)
+
+    def compress(self, name):
+        with self.open(name) as file:
+            data = file.read()
+        for _, suffix, compress in ENCODINGS:
+            compressed = compress(data)
+            if len(compressed) >= len(data):
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(compressed))
+
+
+def find_static_file(root, path):
+    """Полный путь к файлу статики path внутри root или None."""
+    full_path = os.path.realpath(os.path.join(root, path))
+    if not full_path.startswith(os.path.realpath(root) + os.sep):
+        return None
+    return full_path if os.path.isfile(full_path) else None
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, кроме запрещённых через q=0."""
+    encodings = set()
+    for item in header.split(','):
+        name, *params = [part.strip() for part in item.split(';')]
+        quality = 1.0
+        for param in params:
+            if param.startswith('q='):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            encodings.add(name.lower())
+    return encodings
+
+
+def serve_static(request, path):
+    """Ответ с файлом статики path, сжатым, если клиент это принимает."""
+    content_type, _ = mimetypes.guess_type(path)
+    accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    encoding = None
+    file_path = path
+    for name, suffix in SERVED_ENCODINGS:
+        if name in accepted and os.path.isfile(path + suffix):
+            encoding, file_path = name, path + suffix
+            break
+    stat = os.stat(file_path)
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'),
+                              stat.st_mtime, stat.st_size):
+        response = HttpResponseNotModified()
+    else:
+        response = FileResponse(
+            open(file_path, 'rb'),
+            content_type=content_type or 'application/octet-stream')
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    if path.endswith(COMPRESSIBLE):
+        response['Vary'] = 'Accept-Encoding'
+    response['Cache-Control'] = (
+        IMMUTABLE if HASHED_NAME.search(path) else REVALIDATE)
+    return response
@@ -0,0 +1,509 @@
+import asyncio
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db import connections, router
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.http import HttpResponse
+from django.template import RequestContext, Template
+from django.templatetags.static import static
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Post, User
+
+from .context_processors import lazy_context, memoize
+from .management.commands.profile_startup import (
+    compare_line, failure_reason)
+from .db import copy_sqlite
+from .jobs import TASKS, enqueue, run_pending, task
+from .metrics import MetricsStore, get_store
+from .middleware import ReplicaMiddleware
+from .models import Job
+from .warmup import compile_templates
+
+
+@override_settings(
+    REQUEST_TIMING_SAMPLE_RATE=1.0, REQUEST_TIMING_TEMPLATES=True)
+class TimingMiddlewareTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='timing')
+        Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        for metric in ('sql;dur=', 'tpl;dur=', 'view;dur='):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, timing)
+        self.assertRegex(timing, r'desc="[1-9]\d* queries"')
+
+    @override_settings(REQUEST_TIMING_TEMPLATES=False)
+    def test_template_timing_is_optional(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertIn('sql;dur=', response['Server-Timing'])
+        self.assertNotIn('tpl;dur=', response['Server-Timing'])
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=0)
+    def test_unsampled_request_is_not_reported(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=0, REQUEST_TIMING_SLOW_MS=0)
+    def test_slow_request_logged_outside_sample(self):
+        """Медленный запрос попадает в лог, даже если не попал в выборку"""
+        with self.assertLogs('core.timing', 'WARNING') as logs:
+            self.client.get(reverse('posts:index'))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertTrue(record['queries'])
+
+    @override_settings(REQUEST_TIMING_SLOW_MS=0)
+    def test_slow_request_logs_queries(self):
+        with self.assertLogs('core.timing', 'WARNING') as logs:
+            self.client.get(reverse('posts:index'))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertEqual(record['sql_count'], len(record['queries']))
+        self.assertTrue(
+            any('posts_post' in query['sql'] for query in record['queries']))
+
+
+class MetricsTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(METRICS_DIR=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_metrics_count_requests_by_view(self):
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        text = response.content.decode()
+        self.assertIn('# TYPE yatube_request_duration_seconds histogram', text)
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"}',
+            text)
+        self.assertIn('yatube_db_queries_bucket{view="posts:index",le="+Inf"}',
+                      text)
+        self.assertIn('yatube_post_card_cache_hit_ratio', text)
+        self.assertIn('yatube_feed_cache_hit_ratio', text)
+
+    def test_metrics_sum_worker_files(self):
+        # Другой живой воркер уже сбросил свои значения в общий каталог
+        worker = MetricsStore(pid=os.getppid())
+        labels = {'view': 'posts:index', 'method': 'GET', 'status': 200}
+        worker.inc('yatube_requests_total', labels, 5)
+        worker.flush(force=True)
+
+        get_store().values.clear()
+        self.client.get(reverse('posts:index'))
+        text = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn(
+            'yatube_requests_total'
+            '{method="GET",status="200",view="posts:index"} 6',
+            text)
+
+    def test_metrics_drop_dead_worker_files(self):
+        # Воркер завершился, а его файл остался в каталоге
+        process = subprocess.Popen([sys.executable, '-c', ''])
+        process.wait()
+        worker = MetricsStore(pid=process.pid)
+        worker.inc('yatube_requests_total', {'view': 'dead'}, 5)
+        worker.flush(force=True)
+
+        text = self.client.get(reverse('metrics')).content.decode()
+        self.assertNotIn('view="dead"', text)
+        self.assertFalse(os.path.exists(
+            os.path.join(settings.METRICS_DIR, f'{process.pid}.json')))
+
+
+class JobQueueTest(TestCase):
+    def setUp(self):
+        self.calls = []
+
+        def record(value):
+            self.calls.append(value)
+        task('tests.record')(record)
+
+        def flaky(value):
+            self.calls.append(value)
+            if len(self.calls) < 2:
+                raise ValueError('временная ошибка')
+        task('tests.flaky')(flaky)
+        self.addCleanup(TASKS.pop, 'tests.record')
+        self.addCleanup(TASKS.pop, 'tests.flaky')
+
+    def test_job_runs_once_per_key(self):
+        enqueue('tests.record', key='one', value=1)
+        enqueue('tests.record', key='one', value=1)
+        self.assertEqual(Job.objects.count(), 1)
+        self.assertEqual(self.calls, [])
+
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(self.calls, [1])
+        self.assertEqual(Job.objects.get().status, Job.DONE)
+        # Выполненная задача с тем же ключом повторно не ставится
+        enqueue('tests.record', key='one', value=1)
+        self.assertEqual(run_pending(), 0)
+
+    @override_settings(JOBS_RETRY_DELAY=0)
+    def test_failed_job_is_retried(self):
+        enqueue('tests.flaky', value=1)
+        with self.assertLogs('core.jobs', 'WARNING'):
+            run_pending(limit=1)
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn('временная ошибка', job.last_error)
+
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.attempts, 2)
+
+    @override_settings(JOBS_RETRY_DELAY=0)
+    def test_job_fails_after_max_attempts(self):
+        enqueue('tests.flaky', max_attempts=1, value=1)
+        with self.assertLogs('core.jobs', 'ERROR'):
+            run_pending()
+        self.assertEqual(Job.objects.get().status, Job.FAILED)
+
+    def test_stale_running_job_is_reclaimed(self):
+        job = enqueue('tests.record', value=2)
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.RUNNING, attempts=1,
+            locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(self.calls, [2])
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_mode_runs_immediately(self):
+        enqueue('tests.record', value=3)
+        self.assertEqual(self.calls, [3])
+        self.assertFalse(Job.objects.exists())
+
+
+class SqlitePragmasTest(SimpleTestCase):
+    def connect(self, path):
+        settings_dict = dict(connections.databases['default'], NAME=path)
+        connection = DatabaseWrapper(settings_dict, alias='pragmas')
+        self.addCleanup(connection.close)
+        connection.ensure_connection()
+        return connection
+
+    def pragma(self, connection, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    @override_settings(SQLITE_PRAGMAS={
+        'journal_mode': 'WAL', 'synchronous': 'NORMAL',
+        'busy_timeout': 5000})
+    def test_pragmas_applied_on_connect(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        connection = self.connect(f'{directory.name}/db.sqlite3')
+        self.assertEqual(self.pragma(connection, 'journal_mode'), 'wal')
+        # NORMAL = 1
+        self.assertEqual(self.pragma(connection, 'synchronous'), 1)
+        self.assertEqual(self.pragma(connection, 'busy_timeout'), 5000)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTest(SimpleTestCase):
+    def request(self, method, path='/', write=False, cookies=None):
+        routed = {}
+
+        def view(request):
+            routed['read'] = router.db_for_read(Post)
+            if write:
+                routed['write'] = router.db_for_write(Post)
+            return HttpResponse()
+
+        request = getattr(RequestFactory(), method)(path)
+        request.COOKIES.update(cookies or {})
+        response = ReplicaMiddleware(view)(request)
+        return routed, response
+
+    def test_safe_request_reads_from_replica(self):
+        routed, response = self.request('get')
+        self.assertEqual(routed['read'], 'replica')
+        self.assertNotIn('use_primary', response.cookies)
+        # Вне запроса чтение идёт в основную базу
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_write_sticks_client_to_primary(self):
+        routed, response = self.request('post', write=True)
+        self.assertEqual(routed['read'], 'default')
+        self.assertEqual(routed['write'], 'default')
+        cookie = response.cookies['use_primary']
+        self.assertEqual(cookie['max-age'], 10)
+
+        routed, _ = self.request('get', cookies={'use_primary': '1'})
+        self.assertEqual(routed['read'], 'default')
+
+    def test_admin_reads_from_primary(self):
+        routed, _ = self.request('get', '/admin/posts/post/')
+        self.assertEqual(routed['read'], 'default')
+
+
+class CopySqliteTest(TestCase):
+    def test_copy_contains_schema(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = f'{directory.name}/replica.sqlite3'
+        connection = connections['default']
+        connection.ensure_connection()
+        copy_sqlite(connection.connection, path)
+
+        replica = sqlite3.connect(path)
+        self.addCleanup(replica.close)
+        tables = {row[0] for row in replica.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'")}
+        self.assertIn('posts_post', tables)
+
+
+STATIC_ROOT = tempfile.mkdtemp()
+STATICFILES_STORAGE = 'core.staticfiles.CompressedManifestStaticFilesStorage'
+
+
+@override_settings(
+    STATIC_ROOT=STATIC_ROOT,
+    STATICFILES_STORAGE=STATICFILES_STORAGE)
+class StaticFilesTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(STATIC_ROOT, ignore_errors=True)
+
+    def test_hashed_file_is_compressed_and_immutable(self):
+        url = static('css/bootstrap.min.css')
+        self.assertRegex(url, r'bootstrap\.min\.[0-9a-f]{12}\.css$')
+        for accept, encoding in (('gzip', 'gzip'), ('gzip, br', 'br')):
+            with self.subTest(accept=accept):
+                response = self.client.get(
+                    url, HTTP_ACCEPT_ENCODING=accept)
+                self.assertEqual(response['Content-Encoding'], encoding)
+                self.assertEqual(response['Content-Type'], 'text/css')
+                self.assertIn('immutable', response['Cache-Control'])
+                self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertTrue(
+            b''.join(response.streaming_content).startswith(b'@charset'))
+
+    def test_unhashed_file_is_revalidated(self):
+        response = self.client.get('/static/img/logo.png')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('immutable', response['Cache-Control'])
+        response = self.client.get(
+            '/static/img/logo.png',
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_path_outside_static_root_is_not_served(self):
+        response = self.client.get('/static/../settings.py')
+        self.assertEqual(response.status_code, 404)
+
+
+class TemplateWarmupTest(SimpleTestCase):
+    def test_all_site_templates_compile(self):
+        results = {name: error for name, _, error in compile_templates()}
+        for name in ('base.html', 'includes/header.html',
+                     'posts/includes/post_card.html', 'users/login.html',
+                     'about/author.html'):
+            with self.subTest(name=name):
+                self.assertIn(name, results)
+                self.assertIsNone(results[name])
+
+    def test_check_reports_parse_and_lookup_time(self):
+        out = StringIO()
+        call_command('check_templates', stdout=out)
+        header = out.getvalue().splitlines()[0]
+        self.assertIn('разбор мс', header)
+        self.assertIn('получение мс', header)
+        self.assertNotIn('отрисовка', header)
+
+    def test_broken_template_fails_check(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with open(f'{directory.name}/broken.html', 'w') as file:
+            file.write('{% if %}')
+        templates = [dict(settings.TEMPLATES[0], DIRS=[directory.name])]
+        out = StringIO()
+        with override_settings(TEMPLATES=templates):
+            with self.assertRaisesMessage(CommandError, 'broken.html'):
+                call_command('check_templates', stdout=out)
+        self.assertIn('ошибка', out.getvalue())
+
+
+class ContextProcessorsTest(SimpleTestCase):
+    def test_memoize_keeps_value_until_timeout(self):
+        calls = []
+
+        @memoize(timeout=60)
+        def cached():
+            calls.append(1)
+            return len(calls)
+
+        self.assertEqual(cached(), 1)
+        self.assertEqual(cached(), 1)
+        cached.clear()
+        self.assertEqual(cached(), 2)
+
+        @memoize(timeout=0)
+        def expired():
+            calls.append(1)
+            return len(calls)
+
+        self.assertEqual(expired(), 3)
+        self.assertEqual(expired(), 4)
+
+    def test_lazy_context_computes_only_used_values(self):
+        calls = []
+
+        def factory(name):
+            def value(request):
+                calls.append(name)
+                return name.upper()
+            return value
+
+        processor = lazy_context(used=factory('used'),
+                                 unused=factory('unused'))
+        request = RequestFactory().get('/')
+        context = RequestContext(request, {}, [processor])
+        html = Template('{{ used }} {{ used }}').render(context)
+        self.assertEqual(html, 'USED USED')
+        self.assertEqual(calls, ['used'])
+
+    def test_footer_shows_current_year(self):
+        html = Template('{% include "includes/footer.html" %}').render(
+            RequestContext(RequestFactory().get('/')))
+        self.assertIn(f'© {timezone.now().year} Copyright', html)
+
+
+class ProfileStartupTest(SimpleTestCase):
+    def test_lean_boot_skips_admin(self):
+        out = StringIO()
+        call_command('profile_startup', '--compare', '--repeat', '1',
+                     '--path', reverse('about:author'), '--top', '10000',
+                     stdout=out)
+        normal, lean = out.getvalue().split('== облегчённый запуск')
+        self.assertIn('django.contrib.admin.sites', normal)
+        self.assertNotIn('django.contrib.admin', lean)
+        self.assertNotIn('PIL', lean)
+        self.assertRegex(lean, r'первый ответ \(200\)')
+        self.assertRegex(
+            lean, r'облегчённый запуск (быстрее|медленнее|не отличается)')
+
+    def test_summary_follows_measurements(self):
+        self.assertIn('быстрее на 5.0 мс', compare_line(15, 10))
+        self.assertIn('медленнее на 5.0 мс', compare_line(10, 15))
+        self.assertIn('не отличается', compare_line(10, 10))
+
+    def test_failed_boot_without_stderr(self):
+        process = subprocess.CompletedProcess([], 3, stdout='', stderr='')
+        self.assertEqual(failure_reason(process), 'код возврата 3')
+        with self.assertRaisesMessage(CommandError, 'упал'):
+            call_command('profile_startup', '--repeat', '1',
+                         '--module', 'missing_entry_point',
+                         stdout=StringIO())
+
+
+class AsgiApplicationTest(SimpleTestCase):
+    def request(self, path, body_parts=(b'',)):
+        from yatube.asgi import application
+
+        scope = {
+            'type': 'http',
+            'method': 'GET',
+            'path': path,
+            'query_string': b'',
+            'headers': [(b'host', b'testserver')],
+        }
+        messages = [
+            {'type': 'http.request', 'body': part,
+             'more_body': index < len(body_parts) - 1}
+            for index, part in enumerate(body_parts)
+        ]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(application(scope, receive, send))
+        return sent
+
+    def test_page_is_served_through_thread_pool(self):
+        sent = self.request(reverse('about:author'), (b'', b''))
+        self.assertEqual(sent[0]['type'], 'http.response.start')
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn((b'content-type', b'text/html; charset=utf-8'),
+                      sent[0]['headers'])
+        body = b''.join(message.get('body', b'') for message in sent[1:])
+        self.assertTrue(body)
+        self.assertFalse(sent[-1].get('more_body'))
+
+    def test_streaming_body_stays_on_one_thread(self):
+        """Потоковый ответ читается в потоке, где его начали строить"""
+        from yatube import asgi
+
+        threads = []
+
+        def chunks():
+            for number in range(3):
+                threads.append(threading.get_ident())
+                yield str(number).encode()
+
+        def streaming_app(environ, start_response):
+            threads.append(threading.get_ident())
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return chunks()
+
+        original = asgi.wsgi_application
+        asgi.wsgi_application = streaming_app
+        self.addCleanup(setattr, asgi, 'wsgi_application', original)
+        sent = self.request('/export/')
+        body = b''.join(message.get('body', b'') for message in sent[1:])
+        self.assertEqual(body, b'012')
+        self.assertEqual(len(set(threads)), 1)
+
+    def test_repeated_cookie_headers_joined_as_cookie(self):
+        from yatube.asgi import build_environ
+
+        environ = build_environ({
+            'method': 'GET',
+            'path': '/',
+            'headers': [
+                (b'cookie', b'a=1'), (b'cookie', b'b=2'),
+                (b'accept', b'text/html'), (b'accept', b'*/*'),
+            ],
+        }, b'')
+        self.assertEqual(environ['HTTP_COOKIE'], 'a=1; b=2')
+        self.assertEqual(environ['HTTP_ACCEPT'], 'text/html,*/*')
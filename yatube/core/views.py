@@ -0,0 +1,13 @@
+from django.http import HttpResponse
+from django.views.decorators.cache import never_cache
+
+from .metrics import collect, get_store, render
+
+
+@never_cache
+def metrics(request):
+    """Метрики всех процессов сайта в текстовом формате Prometheus."""
+    # Свежие значения своего процесса, остальные - с их последнего сброса
+    get_store().flush(force=True)
+    return HttpResponse(
+        render(collect()), content_type='text/plain; version=0.0.4')
@@ -0,0 +1,58 @@
+import logging
+import os
+import time
+
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger('core.warmup')
+
+TEMPLATE_SUFFIXES = ('.html', '.txt', '.xml')
+
+
+def template_names(dirs):
+    """Имена шаблонов в каталогах dirs, как их передают в get_template()."""
+    names = []
+    for directory in dirs:
+        for root, _, files in os.walk(directory):
+            for file in sorted(files):
+                if file.endswith(TEMPLATE_SUFFIXES):
+                    path = os.path.relpath(os.path.join(root, file), directory)
+                    names.append(path.replace(os.sep, '/'))
+    return list(dict.fromkeys(names))
+
+
+def compile_templates():
+    """Разбирает все шаблоны из DIRS каждого движка Django.
+
+    С кэширующим загрузчиком разобранные шаблоны остаются в его кэше,
+    и запросы их уже не разбирают. Возвращает тройки (имя, время в
+    секундах, ошибка или None).
+    """
+    results = []
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+        engine = backend.engine
+        for name in template_names(engine.dirs):
+            started = time.perf_counter()
+            try:
+                engine.get_template(name)
+                error = None
+            except (TemplateSyntaxError, TemplateDoesNotExist) as exc:
+                error = exc
+            results.append((name, time.perf_counter() - started, error))
+    return results
+
+
+def warm_up():
+    """Разбирает шаблоны при старте воркера, а не на первых запросах."""
+    started = time.perf_counter()
+    results = compile_templates()
+    elapsed = time.perf_counter() - started
+    for name, _, error in results:
+        if error is not None:
+            logger.error('Шаблон %s не разбирается: %s', name, error)
+    logger.info('Шаблонов разобрано при старте: %s за %.1f мс',
+                len(results), elapsed * 1000)
+    return results
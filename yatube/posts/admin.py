@@ -1,5 +1,32 @@
 from django.contrib import admin
-from .models import Post, Group
+from django.http import StreamingHttpResponse
+from .export import export_posts
+from .models import Follow, Post, Group
+
+
+def export_response(queryset, fmt):
+    """Скачивание выгрузки: сжимается и отдаётся по мере чтения базы."""
+    response = StreamingHttpResponse(
+        export_posts(queryset, fmt=fmt, compress=True),
+        content_type='application/gzip',
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="posts.{fmt}.gz"')
+    return response
+
+
+def export_jsonl(modeladmin, request, queryset):
+    return export_response(queryset, 'jsonl')
+
+
+export_jsonl.short_description = 'Выгрузить в JSONL (gzip)'
+
+
+def export_csv(modeladmin, request, queryset):
+    return export_response(queryset, 'csv')
+
+
+export_csv.short_description = 'Выгрузить в CSV (gzip)'
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -12,12 +39,21 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     # Это свойство сработает для всех колонок: где пусто — там будет эта строка
     empty_value_display = '-пусто-'
+    # Выгрузка выбранных постов потоком
+    actions = (export_jsonl, export_csv)
 
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('pk', 'title', 'slug',)
 
 
+class FollowAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'user', 'author',)
+    # Пользователей много: выбираем по id, а не выпадающим списком
+    raw_id_fields = ('user', 'author',)
+
+
 # Register your models here.
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
+admin.site.register(Follow, FollowAdmin)
@@ -0,0 +1,114 @@
+import hashlib
+
+from django.db.models import Max, Subquery
+from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from .models import ContentStamp, Group, Post, User
+
+# Строка ContentStamp, общая для всех лент
+FEEDS_STAMP = 'feeds'
+
+
+def last_updated(posts):
+    """Время последней правки среди постов (индексы по updated)."""
+    return posts.aggregate(last=Max('updated'))['last']
+
+
+def touch_feeds_stamp():
+    """Отмечает изменение всех лент, не видное по Post.updated."""
+    now = timezone.now()
+    if not ContentStamp.objects.filter(key=FEEDS_STAMP).update(changed=now):
+        ContentStamp.objects.get_or_create(
+            key=FEEDS_STAMP, defaults={'changed': now})
+
+
+def feeds_stamp():
+    """Запрос отметки; подзапросом её читают вместе с шапкой страницы."""
+    return ContentStamp.objects.filter(key=FEEDS_STAMP).values('changed')
+
+
+def feed_state(head, stamp, posts):
+    """Состояние ленты: шапка, отметка удалений и переименований и
+    последняя правка её постов. Время изменения - позднее из двух."""
+    last = last_updated(posts)
+    changed = max(filter(None, (last, stamp)), default=None)
+    return (head, stamp, last), changed
+
+
+def conditional_page(state_func):
+    """Условный GET (ETag и Last-Modified) для страниц сайта.
+
+    state_func(request, **kwargs) дешёвыми запросами возвращает пару
+    (значения, от которых зависит страница; время её изменения) или
+    None, если объекта нет - тогда решение принимает само представление.
+    Страница зависит и от того, кто её смотрит (шапка, кнопка
+    редактирования), поэтому в ETag входит пользователь.
+    """
+    def get_state(request, *args, **kwargs):
+        # condition() спрашивает ETag и Last-Modified по отдельности
+        if not hasattr(request, '_page_state'):
+            request._page_state = state_func(request, *args, **kwargs)
+        return request._page_state
+
+    def etag(request, *args, **kwargs):
+        state = get_state(request, *args, **kwargs)
+        if state is None:
+            return None
+        viewer = request.user.pk if request.user.is_authenticated else None
+        parts = (state[0], viewer, request.get_full_path())
+        return hashlib.md5(repr(parts).encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        state = get_state(request, *args, **kwargs)
+        return state[1] if state else None
+
+    def decorator(view):
+        # no-cache: браузер хранит страницу, но каждый раз сверяет её
+        return cache_control(no_cache=True)(
+            condition(etag_func=etag, last_modified_func=last_modified)(view)
+        )
+    return decorator
+
+
+# Состояние страниц берётся из базы, а не из кэша: у всех процессов
+# для одних данных одинаковый ETag, и правка в одном процессе сразу
+# видна остальным. Каждое состояние - запросы по индексам, без COUNT(*).
+
+def index_state(request):
+    stamp = feeds_stamp().values_list('changed', flat=True).first()
+    return feed_state(None, stamp, Post.objects.all())
+
+
+def group_state(request, slug):
+    group = Group.objects.filter(slug=slug).annotate(
+        stamp=Subquery(feeds_stamp())).values_list(
+        'pk', 'title', 'description', 'posts_count', 'stamp').first()
+    if group is None:
+        return None
+    return feed_state(
+        group[:-1], group[-1], Post.objects.filter(group_id=group[0]))
+
+
+def profile_state(request, username):
+    author = User.objects.filter(username=username).annotate(
+        stamp=Subquery(feeds_stamp())).values_list(
+        'pk', 'first_name', 'last_name',
+        'profile__posts_count', 'profile__followers_count', 'stamp').first()
+    if author is None:
+        return None
+    return feed_state(
+        author[:-1], author[-1], Post.objects.filter(author_id=author[0]))
+
+
+def post_state(request, post_id):
+    """Пост зависит от своей правки, от автора (имя, счётчик постов)
+    и от названия группы - всё это берётся одним запросом."""
+    row = Post.objects.filter(pk=post_id).values_list(
+        'updated', 'author__username', 'author__first_name',
+        'author__last_name', 'author__profile__posts_count',
+        'group__slug', 'group__title').first()
+    if row is None:
+        return None
+    return row, row[0]
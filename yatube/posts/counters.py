@@ -0,0 +1,63 @@
+from django.db.models import Count, F
+
+from .models import Group, Profile, User
+
+
+def change_posts_count(author_id=None, group_id=None, delta=1):
+    """Сдвигает счётчики постов автора и группы на delta.
+
+    Обновление делается одним UPDATE через F(), без чтения значения,
+    поэтому параллельные записи не теряют инкременты.
+    """
+    targets = (
+        (Profile.objects.filter(user_id=author_id), author_id),
+        (Group.objects.filter(pk=group_id), group_id),
+    )
+    for queryset, pk in targets:
+        if pk is None:
+            continue
+        if delta < 0:
+            # Счётчик беззнаковый: разъехавшийся счётчик чинит recount
+            queryset = queryset.filter(posts_count__gte=-delta)
+        queryset.update(posts_count=F('posts_count') + delta)
+
+
+def change_followers_count(author_id, delta=1):
+    """Сдвигает счётчик подписчиков автора на delta."""
+    queryset = Profile.objects.filter(user_id=author_id)
+    if delta < 0:
+        queryset = queryset.filter(followers_count__gte=-delta)
+    queryset.update(followers_count=F('followers_count') + delta)
+
+
+def recount_posts(user_ids=None, group_ids=None):
+    """Пересчитывает счётчики по таблице постов.
+
+    Без аргументов проходит всех авторов и все группы. Возвращает
+    количество исправленных счётчиков.
+    """
+    fixed = 0
+    users = User.objects.all()
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    rows = users.annotate(real=Count('posts')).values_list(
+        'pk', 'real', 'profile__posts_count')
+    for user_id, real, stored in rows.iterator():
+        if stored is None:
+            Profile.objects.create(user_id=user_id, posts_count=real)
+        elif stored != real:
+            Profile.objects.filter(user_id=user_id).update(posts_count=real)
+        else:
+            continue
+        fixed += 1
+
+    groups = Group.objects.all()
+    if group_ids is not None:
+        groups = groups.filter(pk__in=group_ids)
+    rows = groups.annotate(real=Count('posts')).values_list(
+        'pk', 'real', 'posts_count')
+    for group_id, real, stored in rows.iterator():
+        if stored != real:
+            Group.objects.filter(pk=group_id).update(posts_count=real)
+            fixed += 1
+    return fixed
@@ -0,0 +1,78 @@
+import csv
+import io
+import json
+import zlib
+
+# Поля выгрузки. Совпадают с полями import_posts, так что выгрузку
+# можно загрузить обратно
+FIELDS = ('id', 'text', 'pub_date', 'author', 'group', 'group_title')
+COLUMNS = (
+    'pk', 'text', 'pub_date', 'author__username', 'group__slug',
+    'group__title',
+)
+# Строки склеиваются в куски примерно такого размера перед отдачей
+BUFFER_SIZE = 64 * 1024
+
+
+def iter_rows(queryset, chunk_size=2000):
+    """Строки постов с автором и группой одним запросом.
+
+    values_list() и iterator() читают базу кусками и не создают
+    объекты моделей, поэтому память не растёт с числом строк.
+    """
+    rows = queryset.order_by('pk').values_list(*COLUMNS)
+    for row in rows.iterator(chunk_size=chunk_size):
+        row = dict(zip(FIELDS, row))
+        row['pub_date'] = row['pub_date'].isoformat()
+        yield row
+
+
+def iter_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def iter_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+ENCODERS = {'jsonl': iter_jsonl, 'csv': iter_csv}
+
+
+def iter_bytes(lines):
+    """Кодирует строки в UTF-8 и склеивает их в куски по BUFFER_SIZE."""
+    chunk = []
+    size = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        chunk.append(data)
+        size += len(data)
+        if size >= BUFFER_SIZE:
+            yield b''.join(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        yield b''.join(chunk)
+
+
+def iter_gzip(chunks):
+    """Сжимает поток кусков в gzip на лету."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_posts(queryset, fmt='jsonl', compress=False, chunk_size=2000):
+    """Поток байтов выгрузки постов в формате fmt."""
+    chunks = iter_bytes(ENCODERS[fmt](iter_rows(queryset, chunk_size)))
+    return iter_gzip(chunks) if compress else chunks
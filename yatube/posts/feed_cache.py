@@ -0,0 +1,132 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.db import transaction
+
+from core.jobs import enqueue
+
+# Ленты, для которых кэшируется отрисованный список постов
+FEED_INDEX = 'index'
+FEED_GROUP = 'group'
+FEED_PROFILE = 'profile'
+
+# Попадания и промахи кэшей карточек постов и лент в этом процессе
+_card_stats = {'hits': 0, 'misses': 0}
+_feed_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def feed_cache():
+    """Кэш лент: общий для всех процессов или пустой (DummyCache)."""
+    return caches['feeds']
+
+
+def feed_cache_enabled():
+    """Кэшируются ли ленты (CACHE_IS_SHARED в settings.py)."""
+    return not isinstance(feed_cache(), DummyCache)
+
+
+def feed_version_key(feed, pk=None):
+    return f'feed_version:{feed}:{pk or ""}'
+
+
+def get_feed_version(feed, pk=None):
+    """Текущая версия ленты - часть ключа её закэшированных фрагментов.
+
+    Версия - метка времени в наносекундах. Если ключ версии вытеснен из
+    кэша, берётся новая метка, поэтому старые фрагменты не совпадут
+    ни с одной будущей версией и устаревшая лента не будет показана.
+    """
+    cache = feed_cache()
+    key = feed_version_key(feed, pk)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key, time.time_ns())
+    return version
+
+
+def feed_count(feed, pk, version, queryset):
+    """Число постов ленты, закэшированное под её версией.
+
+    Иначе закэшированная страница всё равно делала бы COUNT(*) для
+    пагинатора на каждом запросе. Число кэшируется вместе со списком
+    постов ленты, поэтому его попадания и промахи - статистика кэша
+    лент.
+    """
+    cache = feed_cache()
+    key = f'feed_count:{feed}:{pk or ""}:{version}'
+    count = cache.get(key)
+    _record(_feed_stats, count is not None)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, settings.FEED_CACHE_TIMEOUT)
+    return count
+
+
+def _set_new_version(key):
+    cache = feed_cache()
+    version = max(time.time_ns(), (cache.get(key) or 0) + 1)
+    cache.set(key, version, None)
+
+
+def bump_feed_version(feed, pk=None):
+    """Выдаёт ленте новую версию: закэшированные фрагменты устаревают.
+
+    Версия меняется сразу и ещё раз после коммита транзакции: пока она
+    не зафиксирована, параллельный читатель мог закэшировать старые
+    данные уже под новой версией. С репликами то же может сделать
+    читатель отстающей реплики, поэтому воркер очереди меняет версию
+    ещё раз через REPLICA_STICKY_SECONDS. Это работает только с общим
+    кэшем; без него ленты не кэшируются и повтор не нужен.
+    """
+    key = feed_version_key(feed, pk)
+    _set_new_version(key)
+    transaction.on_commit(lambda: _set_new_version(key))
+    if settings.DATABASE_REPLICAS and feed_cache_enabled():
+        enqueue('posts.bump_feed_version',
+                delay=settings.REPLICA_STICKY_SECONDS, feed=feed, pk=pk)
+
+
+def refresh_feed_version(feed, pk=None):
+    """Меняет версию ленты без отложенных повторов."""
+    _set_new_version(feed_version_key(feed, pk))
+
+
+def bump_post_feeds(author_ids=(), group_ids=()):
+    """Сбрасывает все ленты, в которых может быть показан пост."""
+    bump_feed_version(FEED_INDEX)
+    for author_id in set(author_ids) - {None}:
+        bump_feed_version(FEED_PROFILE, author_id)
+    for group_id in set(group_ids) - {None}:
+        bump_feed_version(FEED_GROUP, group_id)
+
+
+def _record(stats, hit):
+    with _stats_lock:
+        stats['hits' if hit else 'misses'] += 1
+
+
+def _read(stats):
+    with _stats_lock:
+        stats = dict(stats)
+    lookups = stats['hits'] + stats['misses']
+    stats['ratio'] = stats['hits'] / lookups if lookups else 0.0
+    return stats
+
+
+def record_card_lookup(hit):
+    _record(_card_stats, hit)
+
+
+def card_cache_stats():
+    """Статистика кэша карточек постов для подбора его параметров."""
+    return _read(_card_stats)
+
+
+def feed_cache_stats():
+    """Статистика кэша лент: без общего кэша в нём одни промахи."""
+    return _read(_feed_stats)
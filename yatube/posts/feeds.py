@@ -0,0 +1,163 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse, reverse_lazy
+from django.utils.cache import get_conditional_response
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.http import http_date, quote_etag
+
+from .models import Group, Post, User
+
+# Сколько последних постов отдаётся в ленте
+FEED_ITEMS = 20
+
+
+def latest_posts(posts):
+    """Последние посты ленты в порядке индексов (pub_date, id)."""
+    return posts.order_by('-pub_date', '-id')[:FEED_ITEMS]
+
+
+class ConditionalFeedMixin:
+    """Условный GET и кэш тела ленты по её данным.
+
+    ETag считается по шапке ленты и по id, времени правки и авторам её
+    последних постов, Last-Modified - самое позднее время правки среди
+    них. Это один запрос по индексу, без отрисовки, и у всех процессов
+    для одних данных валидаторы одинаковые. Удаление поста меняет
+    набор постов, а с ним и ETag. Тело ленты кэшируется под ETag.
+    """
+
+    def get_feed_head(self, **kwargs):
+        """Поля шапки ленты и выборка её постов."""
+        return (), Post.objects.all()
+
+    def __call__(self, request, *args, **kwargs):
+        head, posts = self.get_feed_head(**kwargs)
+        rows = list(latest_posts(posts).values_list(
+            'pk', 'updated', 'author__username',
+            'author__first_name', 'author__last_name'))
+        name = type(self).__name__
+        digest = hashlib.md5(
+            repr((name, head, rows)).encode()).hexdigest()
+        etag = quote_etag(digest)
+        last_modified = (
+            int(max(row[1] for row in rows).timestamp()) if rows else None)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            key = f'feed_body:{name}:{digest}'
+            cached = cache.get(key)
+            if cached is None:
+                response = super().__call__(request, *args, **kwargs)
+                cache.set(
+                    key,
+                    (response.content, response['Content-Type']),
+                    settings.FEED_CACHE_TIMEOUT,
+                )
+            else:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+
+class LatestPostsFeed(ConditionalFeedMixin, Feed):
+    title = 'Yatube: последние обновления'
+    link = reverse_lazy('posts:index')
+    description = 'Новые записи всех авторов'
+
+    def items(self):
+        return latest_posts(Post.objects.select_related('author', 'group'))
+
+    def item_title(self, item):
+        return item.text[:50]
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', args=[item.pk])
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_updateddate(self, item):
+        return item.updated
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+
+class GroupPostsFeed(LatestPostsFeed):
+
+    def get_feed_head(self, slug):
+        head = Group.objects.filter(slug=slug).values_list(
+            'pk', 'title', 'description').first()
+        if head is None:
+            raise Http404('Группа не найдена')
+        return head, Post.objects.filter(group_id=head[0])
+
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, obj):
+        return f'Yatube: {obj.title}'
+
+    def link(self, obj):
+        return reverse('posts:group_list', args=[obj.slug])
+
+    def description(self, obj):
+        return obj.description
+
+    def items(self, obj):
+        return latest_posts(obj.posts.select_related('author', 'group'))
+
+
+class ProfilePostsFeed(LatestPostsFeed):
+
+    def get_feed_head(self, username):
+        head = User.objects.filter(username=username).values_list(
+            'pk', 'first_name', 'last_name').first()
+        if head is None:
+            raise Http404('Пользователь не найден')
+        return head, Post.objects.filter(author_id=head[0])
+
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, obj):
+        return f'Yatube: записи {obj.get_full_name() or obj.username}'
+
+    def link(self, obj):
+        return reverse('posts:profile', args=[obj.username])
+
+    def description(self, obj):
+        return f'Все записи пользователя {obj.username}'
+
+    def items(self, obj):
+        return latest_posts(obj.posts.select_related('author', 'group'))
+
+
+class AtomLatestPostsFeed(LatestPostsFeed):
+    feed_type = Atom1Feed
+    subtitle = LatestPostsFeed.description
+
+
+class AtomGroupPostsFeed(GroupPostsFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+
+class AtomProfilePostsFeed(ProfilePostsFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
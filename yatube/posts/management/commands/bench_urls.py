@@ -0,0 +1,178 @@
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.bench import percentile
+from posts.models import Group, Post
+
+# Сколько SQL-запросов может выполнить одна страница. Превышение -
+# признак N+1; числа с небольшим запасом над текущими значениями
+QUERY_BUDGETS = {
+    'posts:index': 4,
+    'posts:group_list': 5,
+    'posts:profile': 5,
+    'posts:post_detail': 3,
+    'posts:post_create': 5,
+    'posts:post_edit': 6,
+    'posts:search': 5,
+    'posts:follow_index': 6,
+    'posts:index_feed': 2,
+    'posts:index_atom': 2,
+    'posts:group_feed': 4,
+    'posts:group_atom': 4,
+    'posts:profile_feed': 4,
+    'posts:profile_atom': 4,
+    'users:signup': 2,
+    'users:login': 2,
+    'users:password_change': 4,
+    'users:logout': 4,
+}
+
+
+def clear_caches():
+    """Очищает все кэши: страница строится как после промаха."""
+    for alias in settings.CACHES:
+        caches[alias].clear()
+
+
+def routes(post, author):
+    """Все маршруты posts/urls.py и users/urls.py с реальными аргументами.
+
+    Третий элемент - нужен ли вход на сайт.
+    """
+    group = post.group or Group.objects.first()
+    slug = group.slug if group else 'missing'
+    return [
+        ('posts:index', reverse('posts:index'), False),
+        ('posts:group_list', reverse('posts:group_list', args=[slug]), False),
+        ('posts:profile', reverse('posts:profile', args=[author]), False),
+        ('posts:post_detail',
+         reverse('posts:post_detail', args=[post.pk]), False),
+        ('posts:post_create', reverse('posts:post_create'), True),
+        ('posts:post_edit', reverse('posts:post_edit', args=[post.pk]), True),
+        ('posts:search', reverse('posts:search') + '?q=пост', False),
+        ('posts:follow_index', reverse('posts:follow_index'), True),
+        ('posts:index_feed', reverse('posts:index_feed'), False),
+        ('posts:index_atom', reverse('posts:index_atom'), False),
+        ('posts:group_feed', reverse('posts:group_feed', args=[slug]), False),
+        ('posts:group_atom', reverse('posts:group_atom', args=[slug]), False),
+        ('posts:profile_feed',
+         reverse('posts:profile_feed', args=[author]), False),
+        ('posts:profile_atom',
+         reverse('posts:profile_atom', args=[author]), False),
+        ('users:signup', reverse('users:signup'), False),
+        ('users:login', reverse('users:login'), False),
+        ('users:password_change', reverse('users:password_change'), True),
+        # Выход последним: он разлогинивает клиента
+        ('users:logout', reverse('users:logout'), True),
+    ]
+
+
+class Command(BaseCommand):
+    help = ('Замеряет задержку (p50/p95), число SQL-запросов и размер '
+            'ответа для каждого маршрута posts и users на текущей базе. '
+            'Запросы считаются с пустым кэшем; команда падает, если '
+            'страница превысила бюджет запросов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=20,
+            help='Сколько раз запрашивать каждую страницу')
+        parser.add_argument(
+            '--warm', action='store_true',
+            help='Замерять задержку с прогретым кэшем; бюджет запросов '
+                 'всё равно проверяется с пустым')
+        parser.add_argument(
+            '--output', help='Куда сохранить результаты в JSON')
+        parser.add_argument(
+            '--baseline', help='JSON прошлого прогона для сравнения')
+
+    def handle(self, *args, **options):
+        post = Post.objects.select_related('author', 'group').first()
+        if post is None:
+            raise CommandError(
+                'В базе нет постов: заполните её командой seed_posts.')
+        author = post.author
+        count = max(options['requests'], 1)
+
+        results = {}
+        for name, url, login in routes(post, author.username):
+            client = Client()
+            if login:
+                client.force_login(author)
+            # Первый запрос прогревает шаблоны и соединение
+            client.get(url)
+            # Бюджет проверяем на промахе кэша: N+1 за кэшем лент и
+            # карточек на прогретых запросах не видно
+            clear_caches()
+            with CaptureQueriesContext(connection) as captured:
+                client.get(url)
+            latencies, queries = [], [len(captured)]
+            for _ in range(count):
+                if not options['warm']:
+                    clear_caches()
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = client.get(url)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                queries.append(len(captured))
+            results[name] = {
+                'url': url,
+                'status': response.status_code,
+                'p50_ms': round(statistics.median(latencies), 3),
+                'p95_ms': round(percentile(latencies, 0.95), 3),
+                'queries': max(queries),
+                'bytes': len(response.content),
+            }
+            if login:
+                client.logout()
+
+        baseline = {}
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)['results']
+        self.report(results, baseline)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump({
+                    'requests': count,
+                    'warm': options['warm'],
+                    'posts_per_page': settings.POSTS_PER_PAGE,
+                    'results': results,
+                }, file, ensure_ascii=False, indent=2)
+
+        over = [
+            f'{name} ({result["queries"]} > {QUERY_BUDGETS[name]})'
+            for name, result in results.items()
+            if result['queries'] > QUERY_BUDGETS.get(name, result['queries'])
+        ]
+        if over:
+            raise CommandError(
+                'Превышен бюджет SQL-запросов: ' + ', '.join(over))
+
+    def report(self, results, baseline):
+        self.stdout.write(
+            f'{"маршрут":<24}{"код":>5}{"p50 мс":>10}{"p95 мс":>10}'
+            f'{"SQL":>5}{"байт":>9}  сравнение')
+        for name, result in results.items():
+            line = (
+                f'{name:<24}{result["status"]:>5}{result["p50_ms"]:>10.2f}'
+                f'{result["p95_ms"]:>10.2f}{result["queries"]:>5}'
+                f'{result["bytes"]:>9}'
+            )
+            previous = baseline.get(name)
+            if previous:
+                line += (
+                    f'  p50 {result["p50_ms"] - previous["p50_ms"]:+.2f} мс,'
+                    f' SQL {result["queries"] - previous["queries"]:+d}'
+                )
+            self.stdout.write(line)
@@ -0,0 +1,75 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from posts.timeline import timeline_posts
+from posts.utils import feed_queryset
+
+# Полный проход по таблице постов без индекса
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?posts_post\b(?!.*\bUSING\b)')
+# Любой проход по таблице постов (для отфильтрованных лент нужен SEARCH)
+ANY_SCAN = re.compile(r'^SCAN (TABLE )?posts_post\b')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+def feed_queries():
+    """Запросы лент в том виде, в котором их выполняют представления.
+
+    Возвращает пары (название, queryset, отфильтрован ли запрос).
+    Значения фильтров не важны: план зависит только от формы запроса.
+    """
+    per_page = 10
+    feeds = (
+        ('index', feed_queryset(), False),
+        ('group', feed_queryset().filter(group_id=1), True),
+        ('profile', feed_queryset().filter(author_id=1), True),
+    )
+    cursor = Q(pub_date__lt=timezone.now()) | Q(
+        pub_date=timezone.now(), pk__lt=1)
+    for name, queryset, filtered in feeds:
+        yield (f'{name}: page', queryset[per_page:per_page * 2], filtered)
+        yield (
+            f'{name}: cursor',
+            queryset.filter(cursor).order_by('-pub_date', '-pk')[:per_page],
+            filtered,
+        )
+    # Лента подписок упорядочена по своей таблице, а не по постам:
+    # курсор по (pub_date, id) поста сортирует записи читателя, поэтому
+    # проверяем только постраничный режим
+    yield ('timeline: page', timeline_posts(1)[per_page:per_page * 2], True)
+
+
+class Command(BaseCommand):
+    help = ('Проверяет EXPLAIN QUERY PLAN запросов лент: ни один не должен '
+            'сканировать таблицу постов целиком или сортировать во '
+            'временном B-дереве.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError(
+                'Проверка планов поддерживается только для SQLite.')
+        failures = []
+        with connection.cursor() as cursor:
+            for name, queryset, filtered in feed_queries():
+                sql, params = queryset.query.sql_with_params()
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                details = [row[-1] for row in cursor.fetchall()]
+                scan = ANY_SCAN if filtered else FULL_SCAN
+                bad = [
+                    detail for detail in details
+                    if TEMP_SORT in detail or scan.match(detail)
+                ]
+                status = 'FAIL' if bad else 'OK'
+                self.stdout.write(f'[{status}] {name}')
+                for detail in details:
+                    self.stdout.write(f'    {detail}')
+                if bad:
+                    failures.append(name)
+        if failures:
+            raise CommandError(
+                'Запросы лент без подходящего индекса: '
+                + ', '.join(failures))
+        self.stdout.write(self.style.SUCCESS('Все ленты используют индексы.'))
@@ -0,0 +1,41 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts.export import ENCODERS, export_posts
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Выгружает посты с авторами и группами в JSONL или CSV '
+            'потоком, не загружая их в память.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format', choices=sorted(ENCODERS), default='jsonl',
+            help='Формат выгрузки')
+        parser.add_argument(
+            '--output', '-o', default='-',
+            help='Файл выгрузки или "-" для stdout')
+        parser.add_argument(
+            '--gzip', action='store_true', help='Сжать выгрузку gzip')
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Сколько строк читать из базы за раз')
+
+    def handle(self, *args, **options):
+        chunks = export_posts(
+            Post.objects.all(),
+            fmt=options['format'],
+            compress=options['gzip'],
+            chunk_size=options['chunk_size'],
+        )
+        if options['output'] == '-':
+            output = sys.stdout.buffer
+            for chunk in chunks:
+                output.write(chunk)
+            output.flush()
+            return
+        with open(options['output'], 'wb') as output:
+            for chunk in chunks:
+                output.write(chunk)
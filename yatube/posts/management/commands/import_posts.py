@@ -0,0 +1,222 @@
+import csv
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts.counters import recount_posts
+from posts.feed_cache import bump_post_feeds
+from posts.models import Group, Post, User
+from posts.timeline import fan_out_bulk_posts
+from posts.validators import validate_not_empty
+
+# Сколько id передавать в один запрос пересчёта счётчиков
+RECOUNT_CHUNK = 500
+
+
+@contextmanager
+def keep_pub_date():
+    """Сохраняем дату публикации из файла вместо auto_now_add.
+
+    bulk_create вызывает pre_save полей, и auto_now_add перезаписал бы
+    заданную дату. Флаг поля общий для процесса, поэтому выключаем его
+    только на время одной вставки и обязательно возвращаем.
+    """
+    field = Post._meta.get_field('pub_date')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def read_records(stream, fmt, skip=0):
+    """Построчно читает записи, не загружая файл в память.
+
+    Отдаёт пары (номер строки, запись); строки JSONL отдаются как есть
+    и разбираются в parse_record, чтобы битая строка пропускалась, а не
+    прерывала импорт. Первые skip записей пропускаются без разбора.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in islice(reader, skip, None):
+            yield reader.line_num, row
+        return
+    lines = (
+        (number, line) for number, line in enumerate(stream, start=1)
+        if line.strip()
+    )
+    yield from islice(lines, skip, None)
+
+
+def parse_record(record):
+    """Запись CSV уже словарь; строку JSONL разбираем здесь."""
+    if isinstance(record, str):
+        record = json.loads(record)
+        if not isinstance(record, dict):
+            raise ValueError('ожидался объект JSON')
+    return record
+
+
+def chunked(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), RECOUNT_CHUNK):
+        yield ids[start:start + RECOUNT_CHUNK]
+
+
+class Command(BaseCommand):
+    help = ('Импортирует посты из JSONL или CSV (поля text, author, group, '
+            'pub_date) пакетами через bulk_create. Прерванный импорт '
+            'продолжается с контрольной точки.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Файл с записями или "-" для чтения из stdin')
+        parser.add_argument(
+            '--format', choices=('jsonl', 'csv'),
+            help='Формат записей; по умолчанию определяется по расширению')
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Сколько записей сохранять в одной транзакции')
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки; по умолчанию <path>.checkpoint')
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Игнорировать контрольную точку и начать сначала')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl')
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size должен быть больше нуля.')
+        checkpoint = options['checkpoint']
+        if checkpoint is None and path != '-':
+            checkpoint = path + '.checkpoint'
+        done = 0
+        if checkpoint and not options['restart']:
+            done = self.read_checkpoint(checkpoint)
+            if done:
+                self.stdout.write(f'Продолжаем с записи {done}.')
+
+        # Таблицы соответствия загружаем один раз, без объектов моделей
+        self.authors = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.skipped = 0
+        self.touched_authors = set()
+        self.touched_groups = set()
+        # Посты с большим id созданы этим запуском импорта
+        self.last_pk = Post.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+
+        stream = (
+            sys.stdin if path == '-'
+            else open(path, encoding='utf-8', newline='')
+        )
+        started = time.monotonic()
+        imported = 0
+        try:
+            records = read_records(stream, fmt, skip=done)
+            while True:
+                batch = list(islice(records, batch_size))
+                if not batch:
+                    break
+                posts = self.build_posts(batch)
+                with transaction.atomic(), keep_pub_date():
+                    Post.objects.bulk_create(posts)
+                done += len(batch)
+                imported += len(posts)
+                if checkpoint:
+                    self.write_checkpoint(checkpoint, done)
+                rate = imported / max(time.monotonic() - started, 1e-6)
+                self.stdout.write(
+                    f'Импортировано {imported}, пропущено '
+                    f'{self.skipped}: {rate:.0f} записей/с')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            self.finish()
+
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {imported} постов за '
+            f'{time.monotonic() - started:.1f} с, пропущено {self.skipped}.'))
+
+    def build_posts(self, batch):
+        posts = []
+        now = timezone.now()
+        for number, record in batch:
+            try:
+                post = self.build_post(parse_record(record), now)
+            except (ValidationError, ValueError) as error:
+                self.skipped += 1
+                self.stderr.write(f'Строка {number} пропущена: {error}')
+                continue
+            posts.append(post)
+            self.touched_authors.add(post.author_id)
+            self.touched_groups.add(post.group_id)
+        return posts
+
+    def build_post(self, record, now):
+        text = record.get('text') or ''
+        validate_not_empty(text)
+        username = record.get('author')
+        if username not in self.authors:
+            raise ValueError(f'автор {username!r} не найден')
+        group_id = None
+        if record.get('group'):
+            if record['group'] not in self.groups:
+                raise ValueError(f'группа {record["group"]!r} не найдена')
+            group_id = self.groups[record['group']]
+        pub_date = now
+        if record.get('pub_date'):
+            pub_date = parse_datetime(record['pub_date'])
+            if pub_date is None:
+                raise ValueError(f'дата {record["pub_date"]!r} не распознана')
+            if timezone.is_naive(pub_date):
+                pub_date = timezone.make_aware(pub_date)
+        return Post(
+            text=text,
+            author_id=self.authors[username],
+            group_id=group_id,
+            pub_date=pub_date,
+        )
+
+    def finish(self):
+        """bulk_create не шлёт сигналов: чиним счётчики, сбрасываем
+        ленты затронутых авторов и групп и раскладываем новые посты
+        по лентам подписчиков."""
+        self.touched_groups.discard(None)
+        for user_ids in chunked(self.touched_authors):
+            recount_posts(user_ids=user_ids, group_ids=[])
+        for group_ids in chunked(self.touched_groups):
+            recount_posts(user_ids=[], group_ids=group_ids)
+        bump_post_feeds(self.touched_authors, self.touched_groups)
+        fan_out_bulk_posts(self.touched_authors, self.last_pk)
+
+    @staticmethod
+    def read_checkpoint(checkpoint):
+        try:
+            with open(checkpoint) as file:
+                return int(file.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def write_checkpoint(checkpoint, done):
+        # Пишем через временный файл, чтобы точка не оказалась битой
+        temporary = checkpoint + '.tmp'
+        with open(temporary, 'w') as file:
+            file.write(str(done))
+        os.replace(temporary, checkpoint)
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import recount_posts
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счётчики постов авторов и групп по таблице '
+            'постов и исправляет разъехавшиеся значения.')
+
+    def handle(self, *args, **options):
+        fixed = recount_posts()
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счётчиков: {fixed}'))
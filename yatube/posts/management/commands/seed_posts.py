@@ -0,0 +1,99 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from posts.counters import recount_posts
+from posts.feed_cache import bump_post_feeds
+from posts.models import Group, Post, Profile, User
+from posts.timeline import fan_out_bulk_posts
+
+from .import_posts import keep_pub_date
+
+WORDS = (
+    'лев толстой война мир пост дом сад ёлка зелёный город река лето '
+    'зима книга письмо дорога музыка новости друг работа отпуск'
+).split()
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу большим набором авторов, групп и постов для '
+            'нагрузочных замеров (bench_urls). Пишет через bulk_create.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--authors', type=int, default=10_000)
+        parser.add_argument('--groups', type=int, default=500)
+        parser.add_argument(
+            '--batch-size', type=int, default=10_000,
+            help='Сколько постов сохранять в одной транзакции')
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Зерно генератора, чтобы прогоны были сравнимы')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        started = time.monotonic()
+        prefix = f'bench{int(time.time())}'
+        # Вход под этими пользователями не нужен: пароль недействителен,
+        # зато не тратим время на хеширование
+        password = make_password(None)
+
+        # batch_size не передаём: Django сам делит вставку на пакеты по
+        # пределам базы (в SQLite - не больше 500 строк в одном INSERT)
+        with transaction.atomic():
+            User.objects.bulk_create(
+                (User(username=f'{prefix}_{number}', password=password)
+                 for number in range(options['authors']))
+            )
+            Group.objects.bulk_create(
+                (Group(title=f'Группа {number}', slug=f'{prefix}-{number}',
+                       description=f'Описание группы {number}')
+                 for number in range(options['groups']))
+            )
+        author_ids = list(User.objects.filter(
+            username__startswith=f'{prefix}_').values_list('pk', flat=True))
+        group_ids = list(Group.objects.filter(
+            slug__startswith=f'{prefix}-').values_list('pk', flat=True))
+        Profile.objects.bulk_create(
+            (Profile(user_id=pk) for pk in author_ids)
+        )
+        self.stdout.write(
+            f'Авторов: {len(author_ids)}, групп: {len(group_ids)}')
+
+        # Посты равномерно за последний год, четверть - без группы
+        total = options['posts']
+        start = timezone.now() - timedelta(days=365)
+        step = timedelta(days=365) / max(total, 1)
+        group_choices = group_ids + [None] * (len(group_ids) // 3 or 1)
+        created = 0
+        last_pk = Post.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+        while created < total:
+            size = min(batch_size, total - created)
+            posts = [
+                Post(
+                    text=' '.join(rng.choices(WORDS, k=12)),
+                    author_id=rng.choice(author_ids),
+                    group_id=rng.choice(group_choices),
+                    pub_date=start + step * (created + number),
+                )
+                for number in range(size)
+            ]
+            with transaction.atomic(), keep_pub_date():
+                Post.objects.bulk_create(posts)
+            created += size
+            rate = created / (time.monotonic() - started)
+            self.stdout.write(f'Постов: {created} ({rate:.0f}/с)')
+
+        recount_posts()
+        bump_post_feeds(author_ids, group_ids)
+        # Как и у импорта: сигналов не было, ленты подписок пусты
+        fan_out_bulk_posts(author_ids, last_pk)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - started:.1f} с'))
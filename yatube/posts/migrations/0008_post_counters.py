@@ -0,0 +1,46 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    """Создаёт профили всем пользователям и считает посты."""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Group = apps.get_model('posts', 'Group')
+    Profile = apps.get_model('posts', 'Profile')
+    Profile.objects.bulk_create(
+        Profile(user_id=user_id, posts_count=count)
+        for user_id, count in User.objects.annotate(
+            count=Count('posts')).values_list('pk', 'count')
+    )
+    for group_id, count in Group.objects.annotate(
+            count=Count('posts')).values_list('pk', 'count'):
+        Group.objects.filter(pk=group_id).update(posts_count=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0007_post_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='Profile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posts_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='profile', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
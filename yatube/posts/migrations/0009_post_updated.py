@@ -0,0 +1,26 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:23
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_pub_date(apps, schema_editor):
+    """Старые посты считаем не редактировавшимися с момента публикации."""
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.update(updated=F('pub_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_post_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(copy_pub_date, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+from django.db import migrations
+
+# Полнотекстовый индекс SQLite FTS5 по тексту постов. Таблица без
+# собственного содержимого (content=''), текст приводится к одному
+# виду: unicode61 сворачивает регистр, а «ё» заменяем на «е» сами.
+NORMALIZE = "replace(replace({}, 'ё', 'е'), 'Ё', 'Е')"
+
+FORWARD = [
+    "CREATE VIRTUAL TABLE posts_post_fts USING fts5("
+    "text, content='', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER posts_post_fts_insert AFTER INSERT ON posts_post BEGIN "
+    "INSERT INTO posts_post_fts(rowid, text) "
+    f"VALUES (new.id, {NORMALIZE.format('new.text')}); END",
+    "CREATE TRIGGER posts_post_fts_delete AFTER DELETE ON posts_post BEGIN "
+    "INSERT INTO posts_post_fts(posts_post_fts, rowid, text) "
+    f"VALUES ('delete', old.id, {NORMALIZE.format('old.text')}); END",
+    "CREATE TRIGGER posts_post_fts_update AFTER UPDATE OF text "
+    "ON posts_post BEGIN "
+    "INSERT INTO posts_post_fts(posts_post_fts, rowid, text) "
+    f"VALUES ('delete', old.id, {NORMALIZE.format('old.text')}); "
+    "INSERT INTO posts_post_fts(rowid, text) "
+    f"VALUES (new.id, {NORMALIZE.format('new.text')}); END",
+    "INSERT INTO posts_post_fts(rowid, text) "
+    f"SELECT id, {NORMALIZE.format('text')} FROM posts_post",
+]
+
+BACKWARD = [
+    "DROP TRIGGER IF EXISTS posts_post_fts_insert",
+    "DROP TRIGGER IF EXISTS posts_post_fts_delete",
+    "DROP TRIGGER IF EXISTS posts_post_fts_update",
+    "DROP TABLE IF EXISTS posts_post_fts",
+]
+
+
+def run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        # На других СУБД поиск работает через icontains (см. posts/search.py)
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_post_updated'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_sqlite(FORWARD), run_on_sqlite(BACKWARD)),
+    ]
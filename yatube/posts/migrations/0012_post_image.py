@@ -0,0 +1,38 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:14
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+fts = import_module('posts.migrations.0010_post_fts')
+
+# SQLite добавляет поле, пересоздавая таблицу posts_post, и её триггеры
+# поиска пропадают. Сам индекс по id постов остаётся верным
+TRIGGERS = [
+    statement for statement in fts.FORWARD
+    if statement.startswith('CREATE TRIGGER')
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_follow_timeline'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            migrations.RunPython.noop, fts.run_on_sqlite(TRIGGERS)),
+        migrations.AddField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, upload_to='posts/', verbose_name='Картинка'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='thumbnails',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(
+            fts.run_on_sqlite(TRIGGERS), migrations.RunPython.noop),
+    ]
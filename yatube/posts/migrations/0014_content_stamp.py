@@ -0,0 +1,20 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_updated_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentStamp',
+            fields=[
+                ('key', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('changed', models.DateTimeField()),
+            ],
+        ),
+    ]
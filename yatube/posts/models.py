@@ -1,5 +1,9 @@
+import json
+
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.utils.functional import cached_property
 from .validators import validate_not_empty
 
 # Обращение к пользовалям делается через метод в соответствии с документацией
@@ -11,17 +15,36 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    # Счётчик постов группы, поддерживается сигналами (см. posts/signals.py)
+    posts_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self) -> str:
         return self.title
 
 
+class Profile(models.Model):
+    """Данные автора, которые дорого считать на каждом запросе."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='profile')
+    posts_count = models.PositiveIntegerField(default=0, editable=False)
+    # По числу подписчиков решается, раскладывать ли посты автора
+    # по лентам читателей при записи (см. posts/timeline.py)
+    followers_count = models.PositiveIntegerField(default=0, editable=False)
+
+    def __str__(self) -> str:
+        return f'Профиль {self.user}'
+
+
 class Post(models.Model):
     text = models.TextField(
         validators=[validate_not_empty],
         verbose_name='Текст',
     )
     pub_date = models.DateTimeField(auto_now_add=True)
+    # Время последнего изменения - часть ключа кэша карточки поста
+    updated = models.DateTimeField(auto_now=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -35,9 +58,112 @@ class Post(models.Model):
         verbose_name='Группа',
         help_text='Группа, к которой будет относиться пост'
     )
+    image = models.ImageField(
+        'Картинка',
+        upload_to='posts/',
+        blank=True,
+    )
+    # Готовые миниатюры картинки в JSON: размер -> имя файла и размеры.
+    # Заполняет очередь задач (posts/thumbnails.py), пока пусто - их нет
+    thumbnails = models.TextField(blank=True, default='', editable=False)
 
     def __str__(self) -> str:
         return self.text[:15]
 
+    @cached_property
+    def thumbs(self):
+        """Миниатюры по размерам: {'feed': {'url', 'width', 'height'}}."""
+        thumbs = json.loads(self.thumbnails or '{}')
+        for thumb in thumbs.values():
+            thumb['url'] = default_storage.url(thumb['name'])
+        return thumbs
+
     class Meta:
         ordering = ("-pub_date",)
+        # Индексы повторяют форму запросов лент: главная, группа, профиль.
+        # id в конце нужен для курсорной пагинации по (pub_date, id)
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx'),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'),
+            # Время последней правки ленты для условного GET
+            # (posts/conditional.py)
+            models.Index(fields=['updated'], name='post_updated_idx'),
+            models.Index(
+                fields=['author', 'updated'],
+                name='post_author_updated_idx'),
+            models.Index(
+                fields=['group', 'updated'],
+                name='post_group_updated_idx'),
+        ]
+
+
+class Follow(models.Model):
+    """Подписка пользователя user на автора author."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follower')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='following')
+
+    def __str__(self) -> str:
+        return f'{self.user} -> {self.author}'
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_follow'),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Пост в готовой ленте подписок читателя.
+
+    Дата публикации скопирована из поста, чтобы страница ленты читалась
+    одним проходом по индексу (reader, pub_date, id).
+    """
+    reader = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline')
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries')
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ('-pub_date', '-id')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['reader', 'post'], name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['reader', '-pub_date', '-id'],
+                name='timeline_reader_pub_date_idx'),
+        ]
+
+
+class ContentStamp(models.Model):
+    """Время изменения, которого не видно по Post.updated.
+
+    Удаление поста, переименование автора или группы меняют страницы
+    лент, но не время правки оставшихся постов. Сигналы (posts/signals.py)
+    обновляют строку, а условный GET (posts/conditional.py) читает её
+    по первичному ключу.
+    """
+    key = models.CharField(max_length=32, primary_key=True)
+    changed = models.DateTimeField()
+
+    def __str__(self) -> str:
+        return f'{self.key}: {self.changed}'
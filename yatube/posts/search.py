@@ -0,0 +1,59 @@
+import re
+
+from django.db import connection
+
+from .models import Post
+
+# Не больше стольких слов из запроса уходит в индекс
+MAX_TERMS = 8
+# Окончания, которые отрезаем, чтобы «посты», «постами» и «пост»
+# находились одним запросом. Это лёгкая нормализация, а не полный
+# стеммер: остаток слова ищется по префиксу.
+ENDINGS = sorted((
+    'иями', 'ями', 'ами', 'ией', 'ием', 'иях', 'ого', 'его', 'ому', 'ему',
+    'ыми', 'ими', 'ая', 'яя', 'ое', 'ее', 'ой', 'ей', 'ий', 'ый', 'ые', 'ие',
+    'ых', 'их', 'ую', 'юю', 'ом', 'ем', 'ам', 'ям', 'ах', 'ях', 'ов', 'ев',
+    'ть', 'ет', 'ит', 'ут', 'ют', 'ат', 'ят', 'ла', 'ли', 'ло',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+), key=len, reverse=True)
+MIN_STEM = 3
+
+
+def normalize_term(word):
+    """Приводит слово к основе для префиксного поиска."""
+    word = word.lower().replace('ё', 'е')
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def build_match_query(query):
+    """Собирает выражение MATCH для FTS5 из пользовательского запроса.
+
+    Каждое слово ищется по префиксу своей основы; слова берутся в
+    кавычки, поэтому спецсимволы FTS5 из запроса не выполняются.
+    """
+    words = re.findall(r'\w+', query)[:MAX_TERMS]
+    return ' '.join(f'"{normalize_term(word)}"*' for word in words)
+
+
+def search_posts(query):
+    """Посты, подходящие под запрос, от самых релевантных (BM25)."""
+    posts = Post.objects.select_related('author', 'group')
+    match = build_match_query(query)
+    if not match:
+        return posts.none()
+    if connection.vendor != 'sqlite':
+        return posts.filter(text__icontains=query)
+    return posts.extra(
+        tables=['posts_post_fts'],
+        where=[
+            'posts_post_fts.rowid = posts_post.id',
+            'posts_post_fts MATCH %s',
+        ],
+        params=[match],
+        # bm25() тем меньше, чем релевантнее пост
+        select={'search_rank': 'bm25(posts_post_fts)'},
+        order_by=['search_rank', '-pub_date'],
+    )
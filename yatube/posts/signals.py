@@ -0,0 +1,141 @@
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from core.jobs import enqueue
+
+from .conditional import touch_feeds_stamp
+from .counters import change_followers_count, change_posts_count
+from .feed_cache import (FEED_GROUP, FEED_PROFILE, bump_feed_version,
+                         bump_post_feeds)
+from .models import Follow, Group, Post, Profile, User
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, update_fields=None,
+               **kwargs):
+    """У каждого пользователя есть профиль со счётчиком постов."""
+    if created and not raw:
+        Profile.objects.get_or_create(user=instance)
+    # Имя автора выводится в карточках его постов во всех лентах; вход
+    # на сайт меняет только last_login и ленты не затрагивает
+    if update_fields is None or set(update_fields) - {'last_login'}:
+        if created:
+            bump_feed_version(FEED_PROFILE, instance.pk)
+            return
+        group_ids = instance.posts.values_list('group_id', flat=True)
+        bump_post_feeds([instance.pk], group_ids.distinct())
+        # Переименование не меняет время правки постов - отмечаем его
+        # для условного GET
+        touch_feeds_stamp()
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    if created:
+        bump_feed_version(FEED_GROUP, instance.pk)
+        return
+    # Ссылка на группу (slug) выводится в карточках её постов во всех
+    # лентах
+    author_ids = instance.posts.values_list('author_id', flat=True)
+    bump_post_feeds(author_ids.distinct(), [instance.pk])
+    touch_feeds_stamp()
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    # Посты группы останутся без группы (SET_NULL) без сигналов,
+    # поэтому сбрасываем ленты их авторов заранее
+    author_ids = instance.posts.values_list('author_id', flat=True)
+    bump_post_feeds(author_ids.distinct(), [instance.pk])
+    touch_feeds_stamp()
+
+
+@receiver(post_init, sender=Post)
+def remember_counted(sender, instance, **kwargs):
+    """Запоминаем, к чьим счётчикам и лентам пост уже относится
+    и для какой картинки у него готовятся миниатюры.
+
+    Читаем через __dict__, чтобы не подгружать отложенные поля.
+    """
+    instance._counted_author_id = instance.__dict__.get('author_id')
+    instance._counted_group_id = instance.__dict__.get('group_id')
+    instance._thumbnailed_image = str(instance.__dict__.get('image') or '')
+
+
+@receiver(pre_save, sender=Post)
+def image_changed(sender, instance, raw=False, **kwargs):
+    # Миниатюры старой картинки новой не подходят
+    if not raw and instance.image.name != instance._thumbnailed_image:
+        instance.thumbnails = ''
+        instance.__dict__.pop('thumbs', None)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_author_id = instance._counted_author_id
+    old_group_id = instance._counted_group_id
+    with transaction.atomic():
+        if created:
+            change_posts_count(instance.author_id, instance.group_id)
+            # Раскладка по лентам подписчиков - в очереди задач
+            enqueue('posts.fan_out_post', key=f'fan_out_post:{instance.pk}',
+                    post_id=instance.pk)
+        else:
+            # При редактировании счётчики меняются, только если пост
+            # перенесли в другую группу или к другому автору
+            if old_author_id != instance.author_id:
+                change_posts_count(author_id=old_author_id, delta=-1)
+                change_posts_count(author_id=instance.author_id)
+            if old_group_id != instance.group_id:
+                change_posts_count(group_id=old_group_id, delta=-1)
+                change_posts_count(group_id=instance.group_id)
+        # Миниатюры готовит очередь: ленты не ждут уменьшения картинок
+        if instance.image and not instance.thumbnails:
+            enqueue('posts.make_thumbnails',
+                    key=f'make_thumbnails:{instance.pk}:'
+                        f'{instance.updated.timestamp()}',
+                    post_id=instance.pk)
+    bump_post_feeds(
+        [old_author_id, instance.author_id],
+        [old_group_id, instance.group_id],
+    )
+    remember_counted(sender, instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    with transaction.atomic():
+        change_posts_count(
+            instance._counted_author_id,
+            instance._counted_group_id,
+            delta=-1,
+        )
+    bump_post_feeds(
+        [instance._counted_author_id], [instance._counted_group_id])
+    # Удаление не меняет Post.updated оставшихся постов
+    touch_feeds_stamp()
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    with transaction.atomic():
+        change_followers_count(instance.author_id)
+        enqueue('posts.backfill_timeline', reader_id=instance.user_id,
+                author_id=instance.author_id)
+    # На странице автора показаны подписка и кнопка подписаться
+    bump_feed_version(FEED_PROFILE, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    with transaction.atomic():
+        change_followers_count(instance.author_id, delta=-1)
+        enqueue('posts.drop_author', reader_id=instance.user_id,
+                author_id=instance.author_id)
+    bump_feed_version(FEED_PROFILE, instance.author_id)
@@ -0,0 +1,43 @@
+from core.jobs import task
+
+from . import timeline
+from .feed_cache import refresh_feed_version
+from .models import Post
+
+
+@task('posts.fan_out_post')
+def fan_out_post(post_id):
+    # Пост могли удалить раньше, чем до него дошла очередь
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        timeline.fan_out_post(post)
+
+
+@task('posts.fan_out_author_posts')
+def fan_out_author_posts(author_id, after_pk):
+    timeline.fan_out_author_posts(author_id, after_pk)
+
+
+@task('posts.make_thumbnails')
+def make_thumbnails(post_id):
+    # Pillow нужен только воркеру очереди: веб-воркер его не импортирует
+    from . import thumbnails
+
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None and post.image:
+        thumbnails.make_thumbnails(post)
+
+
+@task('posts.backfill_timeline')
+def backfill_timeline(reader_id, author_id):
+    timeline.backfill_timeline(reader_id, author_id)
+
+
+@task('posts.drop_author')
+def drop_author(reader_id, author_id):
+    timeline.drop_author(reader_id, author_id)
+
+
+@task('posts.bump_feed_version')
+def bump_feed_version(feed, pk=None):
+    refresh_feed_version(feed, pk)
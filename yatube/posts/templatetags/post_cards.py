@@ -0,0 +1,39 @@
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+
+from posts.feed_cache import record_card_lookup
+
+register = template.Library()
+
+
+def card_cache_key(post):
+    """Ключ карточки меняется вместе со всем, что в ней выводится."""
+    parts = (
+        post.pk,
+        post.updated.timestamp(),
+        post.author.get_full_name(),
+        post.author.username,
+        post.group.slug if post.group_id else '',
+        get_language(),
+    )
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    return f'post_card:{post.pk}:{digest}'
+
+
+@register.simple_tag
+def post_card(post):
+    """Карточка поста в ленте, отрисованная один раз на версию поста."""
+    key = card_cache_key(post)
+    html = cache.get(key)
+    record_card_lookup(html is not None)
+    if html is None:
+        html = render_to_string(
+            'posts/includes/post_card.html', {'post': post})
+        cache.set(key, html, settings.POST_CARD_CACHE_TIMEOUT)
+    return mark_safe(html)
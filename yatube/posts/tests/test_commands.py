@@ -0,0 +1,191 @@
+import gzip
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.export import FIELDS
+from posts.management.commands.bench_urls import QUERY_BUDGETS
+from posts.models import Follow, Group, Post, Profile, TimelineEntry
+
+from .test_views import FEED_CACHES
+
+User = get_user_model()
+
+
+class ImportPostsCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Importer')
+        cls.group = Group.objects.create(
+            title='Импорт', slug='import', description='Описание')
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def test_import_jsonl_skips_invalid_and_updates_counters(self):
+        records = [
+            {'text': 'Первый', 'author': 'Importer', 'group': 'import',
+             'pub_date': '2020-01-02T03:04:05'},
+            {'text': '', 'author': 'Importer'},
+            {'text': 'Чужой', 'author': 'Nobody'},
+            {'text': 'Второй', 'author': 'Importer'},
+        ]
+        path = self.write('posts.jsonl', '\n'.join(
+            json.dumps(record, ensure_ascii=False) for record in records))
+        call_command(
+            'import_posts', path, batch_size=2,
+            stdout=StringIO(), stderr=StringIO())
+
+        self.assertEqual(Post.objects.count(), 2)
+        first = Post.objects.get(text='Первый')
+        self.assertEqual(first.group, self.group)
+        self.assertEqual(first.pub_date.year, 2020)
+        self.assertEqual(Profile.objects.get(user=self.user).posts_count, 2)
+        self.assertEqual(Group.objects.get(pk=self.group.pk).posts_count, 1)
+        self.assertFalse(os.path.exists(path + '.checkpoint'))
+        self.assertTrue(Post._meta.get_field('pub_date').auto_now_add)
+
+    @override_settings(JOBS_EAGER=True)
+    def test_imported_posts_reach_follower_timelines(self):
+        reader = User.objects.create_user(username='Reader')
+        Follow.objects.create(user=reader, author=self.user)
+        old = Post.objects.create(author=self.user, text='Старый')
+        TimelineEntry.objects.all().delete()
+        path = self.write('posts.jsonl', '\n'.join(
+            json.dumps({'text': text, 'author': 'Importer'},
+                       ensure_ascii=False)
+            for text in ('Первый', 'Второй')))
+        call_command('import_posts', path, stdout=StringIO())
+        self.assertEqual(
+            sorted(TimelineEntry.objects.filter(reader=reader).values_list(
+                'post__text', flat=True)),
+            ['Второй', 'Первый'])
+        self.assertFalse(
+            TimelineEntry.objects.filter(post=old).exists())
+
+    def test_import_skips_malformed_json_lines(self):
+        path = self.write('broken.jsonl', '\n'.join((
+            '{"text": "Первый", "author": "Importer"}',
+            '{"text": "Оборван',
+            '',
+            '["не объект"]',
+            '{"text": "Второй", "author": "Importer"}',
+        )))
+        stderr = StringIO()
+        call_command('import_posts', path, stdout=StringIO(), stderr=stderr)
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', flat=True)),
+            ['Второй', 'Первый'])
+        self.assertIn('Строка 2 пропущена', stderr.getvalue())
+        self.assertIn('Строка 4 пропущена', stderr.getvalue())
+
+    def test_import_csv_resumes_from_checkpoint(self):
+        path = self.write(
+            'posts.csv',
+            'text,author,group\n'
+            'Уже загружен,Importer,\n'
+            'Новый,Importer,import\n'
+        )
+        self.write('posts.csv.checkpoint', '1')
+        call_command('import_posts', path, stdout=StringIO())
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)), ['Новый'])
+
+
+class ExportPostsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Exporter')
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        cls.group = Group.objects.create(
+            title='Выгрузка', slug='export', description='Описание')
+        Post.objects.create(author=cls.user, text='С группой', group=cls.group)
+        Post.objects.create(author=cls.user, text='Без группы')
+
+    def test_export_command_writes_gzip_jsonl(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'posts.jsonl.gz')
+            call_command(
+                'export_posts', output=path, gzip=True, chunk_size=1)
+            with gzip.open(path, 'rt', encoding='utf-8') as file:
+                rows = [json.loads(line) for line in file]
+        self.assertEqual(
+            [(row['text'], row['author'], row['group']) for row in rows],
+            [('С группой', 'Exporter', 'export'),
+             ('Без группы', 'Exporter', None)],
+        )
+
+    def test_admin_action_streams_csv(self):
+        client = Client()
+        client.force_login(self.admin)
+        response = client.post(reverse('admin:posts_post_changelist'), {
+            'action': 'export_csv',
+            '_selected_action': list(
+                Post.objects.values_list('pk', flat=True)),
+        })
+        self.assertTrue(response.streaming)
+        content = gzip.decompress(
+            b''.join(response.streaming_content)).decode()
+        self.assertEqual(content.splitlines()[0], ','.join(FIELDS))
+        self.assertIn('С группой,', content)
+
+
+class SeedPostsCommandTest(TestCase):
+    def test_seed_more_authors_than_sqlite_batch(self):
+        """Больше 500 авторов: пакеты вставки делит сам Django"""
+        call_command(
+            'seed_posts', posts=1000, authors=600, groups=10,
+            stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 1000)
+        self.assertEqual(
+            Profile.objects.filter(user__username__startswith='bench')
+            .count(), 600)
+
+
+@override_settings(CACHES=FEED_CACHES)
+class BenchUrlsCommandTest(TestCase):
+    def setUp(self):
+        call_command(
+            'seed_posts', posts=30, authors=3, groups=2, stdout=StringIO())
+
+    def bench(self, **options):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.json')
+            call_command(
+                'bench_urls', requests=2, output=path, stdout=StringIO(),
+                **options)
+            with open(path, encoding='utf-8') as file:
+                return json.load(file)['results']
+
+    def test_every_route_fits_query_budget(self):
+        """Бенчмарк на маленькой базе: все страницы в бюджете запросов."""
+        results = self.bench()
+        self.assertEqual(set(results), set(QUERY_BUDGETS))
+        for name, result in results.items():
+            with self.subTest(name=name):
+                self.assertEqual(result['status'], 200)
+
+    def test_warm_mode_still_counts_cold_queries(self):
+        """С прогретым кэшем бюджет считается по промаху кэша"""
+        cold = self.bench()
+        warm = self.bench(warm=True)
+        for name in ('posts:index', 'posts:group_list', 'posts:profile'):
+            with self.subTest(name=name):
+                self.assertEqual(
+                    warm[name]['queries'], cold[name]['queries'])
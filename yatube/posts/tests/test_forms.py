@@ -1,6 +1,13 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from PIL import Image
+
 from ..forms import PostForm
 from ..models import Post, Group
-from django.test import Client, TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from http import HTTPStatus
@@ -122,3 +129,61 @@ class TaskCreateFormTests(TestCase):
             ('/auth/login/?next=/create/')
         )
         self.assertEqual(Post.objects.count(), 0)
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, JOBS_EAGER=True)
+class PostImageFormTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='Painter')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def upload(self, size=(2000, 1000), name='big.png'):
+        buffer = BytesIO()
+        Image.new('RGB', size, 'red').save(buffer, 'PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+    def test_create_post_with_image_makes_thumbnails(self):
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с картинкой', 'image': self.upload()},
+        )
+        post = Post.objects.get()
+        self.assertTrue(post.image.name.startswith('posts/'))
+        feed = post.thumbs['feed']
+        self.assertEqual((feed['width'], feed['height']), (640, 320))
+        self.assertRegex(feed['name'], r'^thumbs/feed/\w\w/[0-9a-f]{32}\.jpg$')
+        self.assertEqual(post.thumbs['detail']['width'], 1280)
+
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, feed['url'])
+
+    def test_same_image_shares_thumbnail_files(self):
+        for name in ('first.png', 'second.png'):
+            self.authorized_client.post(
+                reverse('posts:post_create'),
+                data={'text': name, 'image': self.upload(name=name)},
+            )
+        first, second = Post.objects.order_by('pk')
+        self.assertNotEqual(first.image.name, second.image.name)
+        self.assertEqual(first.thumbs['feed']['name'],
+                         second.thumbs['feed']['name'])
+
+    def test_replaced_image_gets_new_thumbnails(self):
+        post = Post.objects.create(
+            text='Пост', author=self.user, image=self.upload())
+        post.refresh_from_db()
+        old_thumbs = post.thumbs
+        post.image = self.upload(size=(300, 600), name='tall.png')
+        post.save()
+        post.refresh_from_db()
+        self.assertNotEqual(post.thumbs, old_thumbs)
+        self.assertEqual(post.thumbs['feed']['height'], 600)
@@ -1,7 +1,10 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
-from posts.models import Group, Post
+from posts.models import Group, Post, Profile
 
 User = get_user_model()
 
@@ -39,3 +42,60 @@ class PostModelTest(TestCase):
         post = PostModelTest.post
         expected_object_name = post.text[:15]
         self.assertEqual(str(post), expected_object_name)
+
+
+class PostIndexesTest(TestCase):
+    def test_feed_queries_use_indexes(self):
+        """Запросы лент не сканируют таблицу и не сортируют во временном
+        B-дереве."""
+        out = StringIO()
+        call_command('check_feed_plans', stdout=out)
+        self.assertNotIn('[FAIL]', out.getvalue())
+
+
+class PostCountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='CounterUser')
+        cls.group = Group.objects.create(
+            title='Группа 1', slug='counter-1', description='Описание')
+        cls.group_2 = Group.objects.create(
+            title='Группа 2', slug='counter-2', description='Описание')
+
+    def assertCounts(self, author, group, group_2):
+        self.assertEqual(
+            Profile.objects.get(user=self.user).posts_count, author)
+        self.assertEqual(
+            Group.objects.get(pk=self.group.pk).posts_count, group)
+        self.assertEqual(
+            Group.objects.get(pk=self.group_2.pk).posts_count, group_2)
+
+    def test_counters_follow_create_edit_delete(self):
+        """Счётчики меняются при создании, переносе и удалении поста."""
+        post = Post.objects.create(
+            author=self.user, text='Пост', group=self.group)
+        Post.objects.create(author=self.user, text='Пост без группы')
+        self.assertCounts(2, 1, 0)
+
+        post = Post.objects.get(pk=post.pk)
+        post.group = self.group_2
+        post.save()
+        self.assertCounts(2, 0, 1)
+
+        post.text = 'Новый текст'
+        post.save()
+        self.assertCounts(2, 0, 1)
+
+        post.delete()
+        self.assertCounts(1, 0, 0)
+
+    def test_recount_repairs_drift(self):
+        """Команда recount чинит счётчики после bulk_create."""
+        Post.objects.bulk_create([
+            Post(author=self.user, text=f'Пост {num}', group=self.group)
+            for num in range(3)
+        ])
+        self.assertCounts(0, 0, 0)
+        call_command('recount', stdout=StringIO())
+        self.assertCounts(3, 3, 0)
@@ -4,6 +4,7 @@ from http import HTTPStatus
 from django.test import TestCase, Client
 from django.contrib.auth import get_user_model
 from posts.models import Post, Group
+from django.core.cache import cache
 
 User = get_user_model()
 
@@ -101,3 +102,78 @@ class PostsURLTests(TestCase):
         """Проверка редактирования поста автором"""
         response = self.authorized_client.get(f'/posts/{self.post.pk}/edit/')
         self.assertEqual(response.status_code, HTTPStatus.OK)
+
+
+class FeedURLTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='FeedAuthor')
+        cls.group = Group.objects.create(
+            title='Группа ленты',
+            slug='feed-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Пост для ленты',
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.urls = (
+            '/feed/',
+            '/feed/atom/',
+            f'/group/{self.group.slug}/feed/',
+            f'/group/{self.group.slug}/feed/atom/',
+            f'/profile/{self.user.username}/feed/',
+            f'/profile/{self.user.username}/feed/atom/',
+        )
+
+    def test_feeds_contain_posts(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertContains(response, 'Пост для ленты')
+                self.assertTrue(response.has_header('ETag'))
+                self.assertTrue(response.has_header('Last-Modified'))
+
+    def test_unknown_feed_object_404(self):
+        for url in ('/group/unknown/feed/', '/profile/unknown/feed/'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_conditional_get_until_post_changes(self):
+        """Повторный запрос с ETag получает 304, пока пост не изменят"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED)
+
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls}
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Исправленный пост'
+        post.save()
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertContains(response, 'Исправленный пост')
+
+    def test_etag_survives_cache_loss_and_follows_deletes(self):
+        """ETag зависит от данных ленты, а не от содержимого кэша"""
+        url = self.urls[0]
+        etag = self.client.get(url)['ETag']
+        cache.clear()
+        self.assertEqual(self.client.get(url)['ETag'], etag)
+
+        extra = Post.objects.create(author=self.user, text='Лишний пост')
+        etag = self.client.get(url)['ETag']
+        Post.objects.filter(pk=extra.pk).delete()
+        self.assertNotEqual(self.client.get(url)['ETag'], etag)
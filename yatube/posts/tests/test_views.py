@@ -1,13 +1,32 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from posts.models import Group, Post
+from django.utils import timezone
+from core.jobs import run_pending
+from core.models import Job
+from posts.models import Follow, Group, Post, TimelineEntry
 from ..forms import PostForm
-from django.core.cache import cache
+from django.core.cache import cache, caches
+from ..feed_cache import card_cache_stats
+from ..templatetags.post_cards import post_card
 
 User = get_user_model()
 
+# Кэш лент как при общем кэше (memcached и т.п.): по умолчанию, с
+# LocMemCache, фрагменты лент не кэшируются
+FEED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'feeds': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'feeds',
+    },
+}
+
 
 class PostsViewsTest(TestCase):
     @classmethod
@@ -259,3 +278,552 @@ class PaginatorViewsTest(TestCase):
         #                 settings.POSTS_PER_PAGE if page == 1 else
         #                 Post.objects.count() - settings.POSTS_PER_PAGE
         #             )
+
+
+@override_settings(POSTS_PAGINATION='cursor')
+class CursorPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(
+            username="cursor_user"
+        )
+        cls.group = Group.objects.create(
+            description="Тестовое описание",
+            slug="cursor-slug",
+            title="Тестовое название"
+        )
+        Post.objects.bulk_create([
+            Post(
+                text=f'text {num}', author=cls.user,
+                group=cls.group
+            ) for num in range(1, 24)
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cursor_pages_walk_forward_and_back(self):
+        """Курсор проходит ленту без пропусков и повторов в обе стороны"""
+        urls = (
+            reverse("posts:index"),
+            reverse(
+                "posts:group_list",
+                kwargs={"slug": self.group.slug}
+            ),
+            reverse(
+                "posts:profile",
+                kwargs={"username": self.user.username}
+            ),
+        )
+        expected = list(
+            Post.objects.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True)
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                pages = []
+                page_obj = self.client.get(url).context['page_obj']
+                self.assertFalse(page_obj.has_previous())
+                pages.append([post.pk for post in page_obj])
+                while page_obj.has_next():
+                    page_obj = self.client.get(
+                        url, {'cursor': page_obj.next_cursor}
+                    ).context['page_obj']
+                    pages.append([post.pk for post in page_obj])
+                self.assertEqual(
+                    [len(page) for page in pages],
+                    [settings.POSTS_PER_PAGE] * 2 + [3]
+                )
+                self.assertEqual(sum(pages, []), expected)
+
+                page_obj = self.client.get(
+                    url, {'cursor': page_obj.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual([post.pk for post in page_obj], pages[1])
+                self.assertTrue(page_obj.has_previous())
+
+    def test_broken_cursor_returns_first_page(self):
+        response = self.client.get(
+            reverse("posts:index"), {'cursor': 'garbage'}
+        )
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), settings.POSTS_PER_PAGE)
+        self.assertFalse(page_obj.has_previous())
+
+
+@override_settings(CACHES=FEED_CACHES)
+class FeedCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username="cache_user")
+        cls.group = Group.objects.create(
+            description="Тестовое описание",
+            slug="cache-slug",
+            title="Тестовое название"
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text="Старый текст",
+            group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        caches['feeds'].clear()
+        self.urls = (
+            reverse("posts:index"),
+            reverse("posts:group_list", kwargs={"slug": self.group.slug}),
+            reverse(
+                "posts:profile", kwargs={"username": self.user.username}
+            ),
+        )
+
+    def test_feed_served_from_cache_until_post_saved(self):
+        """Лента берётся из кэша, пока пост не сохранят через модель"""
+        for url in self.urls:
+            self.client.get(url)
+        # update() не шлёт сигналов - версия лент не меняется
+        Post.objects.filter(pk=self.post.pk).update(text="Новый текст")
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), "Старый текст")
+
+        post = Post.objects.get(pk=self.post.pk)
+        post.save()
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), "Новый текст")
+
+    def test_group_edit_invalidates_group_feed(self):
+        url = self.urls[1]
+        self.client.get(url)
+        self.group.title = "Другое название"
+        self.group.save()
+        self.assertContains(self.client.get(url), "Другое название")
+
+    def test_author_rename_invalidates_all_feeds(self):
+        """Имя автора есть в карточках главной, группы и профиля"""
+        for url in self.urls:
+            self.client.get(url)
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = "Новое"
+        user.last_name = "Имя"
+        user.save()
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), "Новое Имя")
+
+    def test_group_slug_change_invalidates_index_feed(self):
+        """Карточки на главной ссылаются на группу по slug"""
+        url = self.urls[0]
+        self.client.get(url)
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = "other-cache-slug"
+        group.save()
+        self.assertContains(self.client.get(url), "/group/other-cache-slug/")
+
+    def test_logged_in_user_shares_cached_list(self):
+        """Авторизованный видит общий список постов и свою шапку"""
+        self.client.get(self.urls[0])
+        Post.objects.filter(pk=self.post.pk).update(text="Новый текст")
+        auth_client = Client()
+        auth_client.force_login(self.user)
+        response = auth_client.get(self.urls[0])
+        self.assertContains(response, "Старый текст")
+        self.assertContains(response, "Пользователь: cache_user")
+
+    def test_cached_index_costs_no_queries(self):
+        """Закэшированная лента делает только запросы условного GET"""
+        self.client.get(self.urls[0])
+        with self.assertNumQueries(2):
+            response = self.client.get(self.urls[0])
+        self.assertContains(response, "Старый текст")
+
+    @override_settings(CACHES={'feeds': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    }, 'default': FEED_CACHES['default']})
+    def test_no_feed_cache_without_shared_cache(self):
+        """Без общего кэша лента всегда строится заново"""
+        self.client.get(self.urls[0])
+        Post.objects.filter(pk=self.post.pk).update(
+            text="Новый текст", updated=self.post.updated.replace(year=2030))
+        self.assertContains(self.client.get(self.urls[0]), "Новый текст")
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaFeedVersionTest(TestCase):
+    """Повтор смены версии после отставания реплики - через очередь"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="replica_user")
+
+    def create_post(self):
+        Job.objects.all().delete()
+        Post.objects.create(author=self.user, text="Пост")
+        return Job.objects.filter(name='posts.bump_feed_version').count()
+
+    @override_settings(CACHES=FEED_CACHES)
+    def test_shared_cache_bumps_again_later(self):
+        self.assertTrue(self.create_post())
+
+    def test_no_delayed_bump_without_feed_cache(self):
+        self.assertFalse(self.create_post())
+
+
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username="card_user")
+        cls.post = Post.objects.create(author=cls.user, text="Карточка")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_card_rendered_once_per_post_version(self):
+        """Карточка рендерится заново только после правки поста"""
+        before = card_cache_stats()
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertIn("Карточка", post_card(post))
+        self.assertIn("Карточка", post_card(post))
+        post.text = "Исправленная карточка"
+        post.save()
+        self.assertIn("Исправленная карточка", post_card(post))
+
+        after = card_cache_stats()
+        self.assertEqual(after['hits'] - before['hits'], 1)
+        self.assertEqual(after['misses'] - before['misses'], 2)
+
+    def test_card_shows_renamed_author(self):
+        """Автор без полного имени выводится по логину - он в ключе"""
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertIn("card_user", post_card(post))
+        post.author.username = "renamed_user"
+        self.assertIn("renamed_user", post_card(post))
+
+
+class SearchViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username="search_user")
+        cls.tree = Post.objects.create(
+            author=cls.user, text="Зелёная ёлка стояла во дворе")
+        cls.trees = Post.objects.create(
+            author=cls.user, text="Ёлки зелёные, зелёные ёлки и сосны")
+        cls.house = Post.objects.create(
+            author=cls.user, text="Красный дом у дороги")
+
+    def search(self, query):
+        response = self.client.get(reverse("posts:search"), {"q": query})
+        return [post.pk for post in response.context["page_obj"]]
+
+    def test_search_finds_word_forms_ranked(self):
+        """Находятся разные формы слова, чаще упомянутое - выше"""
+        self.assertEqual(
+            self.search("зеленые елки"), [self.trees.pk, self.tree.pk])
+        self.assertEqual(self.search("дома"), [self.house.pk])
+        self.assertEqual(self.search("самолёт"), [])
+        self.assertEqual(self.search('"*)'), [])
+
+    def test_search_index_follows_edits_and_deletes(self):
+        post = Post.objects.get(pk=self.house.pk)
+        post.text = "Синий самолёт"
+        post.save()
+        self.assertEqual(self.search("дом"), [])
+        self.assertEqual(self.search("самолет"), [self.house.pk])
+        post.delete()
+        self.assertEqual(self.search("самолет"), [])
+
+    @override_settings(POSTS_PAGINATION='cursor')
+    def test_search_ranked_in_cursor_mode(self):
+        """Курсорный режим лент не меняет порядок выдачи поиска"""
+        # Самый новый пост - самый слабый по релевантности
+        newest = Post.objects.create(
+            author=self.user,
+            text="Длинный рассказ про лес, реку, поле и одну ёлку")
+        self.assertEqual(
+            self.search("елки"), [self.trees.pk, self.tree.pk, newest.pk])
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username="etag_user")
+        cls.other = User.objects.create_user(username="etag_other")
+        cls.group = Group.objects.create(
+            description="Тестовое описание",
+            slug="etag-slug",
+            title="Тестовое название"
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text="Пост", group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.urls = (
+            reverse("posts:index"),
+            reverse("posts:group_list", kwargs={"slug": self.group.slug}),
+            reverse(
+                "posts:profile", kwargs={"username": self.user.username}
+            ),
+            reverse("posts:post_detail", kwargs={"post_id": self.post.pk}),
+        )
+
+    def get_etags(self, client):
+        return {url: client.get(url)['ETag'] for url in self.urls}
+
+    def test_not_modified_until_post_changes(self):
+        etags = self.get_etags(self.client)
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = "Новый текст"
+        post.save()
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_etag_does_not_depend_on_cache(self):
+        """Потеря кэша (перезапуск, другой процесс) не меняет ETag"""
+        etags = self.get_etags(self.client)
+        cache.clear()
+        self.assertEqual(self.get_etags(self.client), etags)
+
+    def test_etag_depends_on_viewer(self):
+        """Другой пользователь видит другую шапку - ETag не совпадает"""
+        etags = self.get_etags(self.client)
+        other_client = Client()
+        other_client.force_login(self.other)
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = other_client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_not_modified_costs_only_state_queries(self):
+        """304 стоит только запросов состояния: MAX(updated) и отметка
+        изменений по первичному ключу, без COUNT по всем постам"""
+        url = self.urls[0]
+        etag = self.client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 2)
+        for query in queries:
+            self.assertNotIn("COUNT(", query["sql"].upper())
+
+    def assert_feeds_changed(self, etags):
+        for url in self.urls[:2]:
+            with self.subTest(url=url):
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, 200)
+
+    def test_delete_changes_feeds(self):
+        """Удаление поста не трогает updated остальных, но ленты меняются"""
+        extra = Post.objects.create(
+            author=self.other, text="Лишний", group=self.group)
+        etags = self.get_etags(self.client)
+        extra.delete()
+        self.assert_feeds_changed(etags)
+
+    def test_author_rename_changes_feeds(self):
+        """Имя автора выводится в карточках главной и группы"""
+        etags = self.get_etags(self.client)
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = "Новое имя"
+        user.save()
+        self.assert_feeds_changed(etags)
+
+    def test_login_keeps_feeds(self):
+        """Вход меняет только last_login - ленты остаются прежними"""
+        etags = self.get_etags(self.client)
+        user = User.objects.get(pk=self.user.pk)
+        user.last_login = timezone.now()
+        user.save(update_fields=["last_login"])
+        for url in self.urls[:2]:
+            with self.subTest(url=url):
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, 304)
+
+
+class QueryCountTest(TestCase):
+    """Число запросов страницы не зависит от числа постов на ней"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.group = Group.objects.create(
+            description="Тестовое описание",
+            slug="queries-slug",
+            title="Тестовое название"
+        )
+        cls.authors = [
+            User.objects.create_user(username=f"queries_{num}")
+            for num in range(3)
+        ]
+        for num in range(settings.POSTS_PER_PAGE):
+            Post.objects.create(
+                author=cls.authors[num % 3],
+                text=f"Пост {num}",
+                group=cls.group if num % 2 else None,
+            )
+        cls.author = cls.authors[0]
+        cls.post = Post.objects.filter(author=cls.author).first()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feed_and_detail_query_counts(self):
+        # Условный GET, объект страницы, COUNT паджинатора и сами посты
+        pages = (
+            (reverse("posts:index"), 4),
+            (reverse(
+                "posts:group_list", kwargs={"slug": self.group.slug}), 5),
+            (reverse(
+                "posts:profile", kwargs={"username": self.author}), 5),
+            (reverse(
+                "posts:post_detail", kwargs={"post_id": self.post.pk}), 2),
+        )
+        for url, queries in pages:
+            with self.subTest(url=url):
+                with self.assertNumQueries(queries):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_paginator_count_has_no_joins(self):
+        """COUNT(*) пагинатора идёт по индексу постов, без JOIN"""
+        urls = (
+            reverse("posts:index"),
+            reverse("posts:group_list", kwargs={"slug": self.group.slug}),
+            reverse("posts:profile", kwargs={"username": self.author}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as captured:
+                    self.client.get(url)
+                counts = [
+                    query['sql'] for query in captured
+                    if query['sql'].startswith('SELECT COUNT(*)')
+                ]
+                self.assertTrue(counts)
+                for sql in counts:
+                    self.assertNotIn('JOIN', sql)
+
+    def test_post_detail_shows_author_posts_count(self):
+        response = self.client.get(
+            reverse("posts:post_detail", kwargs={"post_id": self.post.pk}))
+        self.assertEqual(
+            response.context['post'].author_posts_count,
+            Post.objects.filter(author=self.author).count()
+        )
+
+
+@override_settings(JOBS_EAGER=True)
+class FollowTimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username="timeline_author")
+        cls.reader = User.objects.create_user(username="timeline_reader")
+        cls.stranger = User.objects.create_user(username="timeline_other")
+        cls.old_post = Post.objects.create(
+            author=cls.author, text="Пост до подписки")
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def follow(self):
+        return self.reader_client.post(reverse(
+            "posts:profile_follow", kwargs={"username": self.author}))
+
+    def timeline(self, client=None):
+        response = (client or self.reader_client).get(
+            reverse("posts:follow_index"))
+        return list(response.context["page_obj"])
+
+    def test_follow_fills_timeline(self):
+        response = self.follow()
+        self.assertRedirects(response, reverse(
+            "posts:profile", kwargs={"username": self.author}))
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.author).exists())
+        self.author.profile.refresh_from_db()
+        self.assertEqual(self.author.profile.followers_count, 1)
+        # Старые посты автора попадают в ленту сразу после подписки
+        self.assertEqual(self.timeline(), [self.old_post])
+
+    def test_new_post_fans_out_to_followers_only(self):
+        self.follow()
+        post = Post.objects.create(author=self.author, text="Новый пост")
+        self.assertTrue(TimelineEntry.objects.filter(
+            reader=self.reader, post=post).exists())
+        self.assertEqual(self.timeline(), [post, self.old_post])
+
+        stranger_client = Client()
+        stranger_client.force_login(self.stranger)
+        self.assertEqual(self.timeline(stranger_client), [])
+
+    def test_unfollow_clears_timeline(self):
+        self.follow()
+        self.reader_client.post(reverse(
+            "posts:profile_unfollow", kwargs={"username": self.author}))
+        self.assertFalse(Follow.objects.filter(
+            user=self.reader, author=self.author).exists())
+        self.assertFalse(TimelineEntry.objects.filter(
+            reader=self.reader).exists())
+        self.assertEqual(self.timeline(), [])
+
+    def test_cannot_follow_yourself_or_by_get(self):
+        self.reader_client.post(reverse(
+            "posts:profile_follow", kwargs={"username": self.reader}))
+        response = self.reader_client.get(reverse(
+            "posts:profile_follow", kwargs={"username": self.author}))
+        self.assertEqual(response.status_code, 405)
+        self.assertFalse(Follow.objects.exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_popular_author_is_merged_on_read(self):
+        self.follow()
+        post = Post.objects.create(author=self.author, text="Новый пост")
+        # Посты автора с множеством подписчиков не раскладываются
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.timeline(), [post, self.old_post])
+
+
+class TimelineQueueTest(TestCase):
+    """Раскладка по лентам уходит в очередь задач, а не в запрос"""
+    def test_post_create_enqueues_fan_out(self):
+        author = User.objects.create_user(username="queue_author")
+        reader = User.objects.create_user(username="queue_reader")
+        Follow.objects.create(user=reader, author=author)
+        run_pending()
+
+        client = Client()
+        client.force_login(author)
+        client.post(reverse("posts:post_create"), {"text": "Пост в очередь"})
+        post = Post.objects.get(text="Пост в очередь")
+        self.assertTrue(
+            Job.objects.filter(key=f"fan_out_post:{post.pk}").exists())
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+
+        run_pending()
+        self.assertTrue(
+            TimelineEntry.objects.filter(reader=reader, post=post).exists())
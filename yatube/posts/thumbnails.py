@@ -0,0 +1,61 @@
+import hashlib
+import json
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .feed_cache import bump_post_feeds
+from .models import Post
+
+
+def render_thumbnail(image, size):
+    """Уменьшает картинку, чтобы она вписалась в size; возвращает JPEG."""
+    thumb = ImageOps.exif_transpose(image)
+    thumb.thumbnail(size, Image.LANCZOS)
+    if thumb.mode != 'RGB':
+        thumb = thumb.convert('RGB')
+    buffer = BytesIO()
+    thumb.save(buffer, 'JPEG', quality=settings.POST_THUMBNAIL_QUALITY,
+               optimize=True, progressive=True)
+    return thumb, buffer.getvalue()
+
+
+def store_thumbnail(size_name, data):
+    """Сохраняет миниатюру под именем из хэша её содержимого.
+
+    Файл с таким именем никогда не меняется, поэтому его можно отдавать
+    с бессрочным кэшированием. Одинаковые миниатюры хранятся один раз.
+    """
+    digest = hashlib.sha256(data).hexdigest()[:32]
+    name = f'thumbs/{size_name}/{digest[:2]}/{digest}.jpg'
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(data))
+    return name
+
+
+def make_thumbnails(post):
+    """Готовит миниатюры всех размеров POST_THUMBNAIL_SIZES для поста.
+
+    Если пока шла задача картинку поста заменили, результат не
+    записывается: для новой картинки поставлена своя задача.
+    """
+    image_name = post.image.name
+    thumbs = {}
+    with post.image.open('rb') as file, Image.open(file) as image:
+        for size_name, size in settings.POST_THUMBNAIL_SIZES.items():
+            thumb, data = render_thumbnail(image, size)
+            thumbs[size_name] = {
+                'name': store_thumbnail(size_name, data),
+                'width': thumb.width,
+                'height': thumb.height,
+            }
+    # updated входит в ключ кэша карточки: она отрисуется с миниатюрой
+    saved = Post.objects.filter(pk=post.pk, image=image_name).update(
+        thumbnails=json.dumps(thumbs), updated=timezone.now())
+    if saved:
+        bump_post_feeds([post.author_id], [post.group_id])
+    return thumbs
@@ -0,0 +1,116 @@
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Q
+
+from core.jobs import enqueue
+
+from .models import Follow, Post, Profile, TimelineEntry
+from .utils import feed_queryset
+
+
+def fans_out(author_id):
+    """Раскладываются ли посты автора по лентам при записи.
+
+    У автора с очень большим числом подписчиков запись стоила бы
+    слишком дорого: его посты подмешиваются в ленту при чтении.
+    """
+    followers = Profile.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True).first()
+    return (followers or 0) <= settings.TIMELINE_FANOUT_LIMIT
+
+
+def fan_out_post(post):
+    """Добавляет пост в ленты подписчиков автора. Возвращает их число."""
+    if not fans_out(post.author_id):
+        return 0
+    reader_ids = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    entries = [
+        TimelineEntry(reader_id=reader_id, post_id=post.pk,
+                      pub_date=post.pub_date)
+        for reader_id in reader_ids.iterator()
+    ]
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=1000, ignore_conflicts=True)
+    return len(entries)
+
+
+def fan_out_author_posts(author_id, after_pk):
+    """Раскладывает посты автора с id больше after_pk по лентам его
+    подписчиков. Нужна после bulk_create, который не шлёт сигналов.
+    Возвращает число добавленных записей."""
+    if not fans_out(author_id):
+        return 0
+    reader_ids = list(Follow.objects.filter(
+        author_id=author_id).values_list('user_id', flat=True))
+    if not reader_ids:
+        return 0
+    posts = Post.objects.filter(
+        author_id=author_id, pk__gt=after_pk).values_list('pk', 'pub_date')
+    entries = (
+        TimelineEntry(reader_id=reader_id, post_id=pk, pub_date=pub_date)
+        for pk, pub_date in posts.iterator()
+        for reader_id in reader_ids
+    )
+    created = 0
+    while True:
+        batch = list(islice(entries, 1000))
+        if not batch:
+            return created
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        created += len(batch)
+
+
+def fan_out_bulk_posts(author_ids, after_pk):
+    """Ставит в очередь раскладку постов, созданных bulk_create после
+    поста after_pk, - по задаче на автора, у которого есть подписчики."""
+    author_ids = list(set(author_ids))
+    for start in range(0, len(author_ids), 500):
+        followed = Follow.objects.filter(
+            author_id__in=author_ids[start:start + 500],
+        ).values_list('author_id', flat=True).distinct()
+        for author_id in followed:
+            enqueue('posts.fan_out_author_posts',
+                    key=f'fan_out_author_posts:{author_id}:{after_pk}',
+                    author_id=author_id, after_pk=after_pk)
+
+
+def backfill_timeline(reader_id, author_id):
+    """Новый подписчик сразу видит последние посты автора."""
+    if not fans_out(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date')[:settings.TIMELINE_BACKFILL]
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(reader_id=reader_id, post_id=pk, pub_date=pub_date)
+         for pk, pub_date in posts],
+        ignore_conflicts=True,
+    )
+
+
+def drop_author(reader_id, author_id):
+    """Убирает посты автора из ленты отписавшегося читателя."""
+    TimelineEntry.objects.filter(
+        reader_id=reader_id, post__author_id=author_id).delete()
+
+
+def timeline_posts(reader):
+    """Посты авторов, на которых подписан reader, от новых к старым.
+
+    Обычно это один проход по индексу готовой ленты читателя. Если
+    среди авторов есть те, чьи посты не раскладываются при записи,
+    их посты добавляются к ленте при чтении.
+    """
+    read_time_authors = list(Follow.objects.filter(
+        user=reader,
+        author__profile__followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).values_list('author_id', flat=True))
+    if not read_time_authors:
+        return feed_queryset().filter(
+            timeline_entries__reader=reader,
+        ).order_by('-timeline_entries__pub_date', '-timeline_entries__id')
+    entries = TimelineEntry.objects.filter(
+        reader=reader).values('post_id')
+    return feed_queryset().filter(
+        Q(pk__in=entries) | Q(author_id__in=read_time_authors))
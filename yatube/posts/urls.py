@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import feeds, views
 
 app_name = 'posts'
 urlpatterns = [
@@ -11,4 +11,41 @@ urlpatterns = [
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<post_id>/edit/', views.post_edit, name='post_edit'),
+    # Лента подписок и подписка на автора
+    path('follow/', views.follow_index, name='follow_index'),
+    path(
+        'profile/<str:username>/follow/',
+        views.profile_follow,
+        name='profile_follow'
+    ),
+    path(
+        'profile/<str:username>/unfollow/',
+        views.profile_unfollow,
+        name='profile_unfollow'
+    ),
+    # Полнотекстовый поиск по постам
+    path('search/', views.search, name='search'),
+    # Ленты RSS и Atom главной, групп и профилей
+    path('feed/', feeds.LatestPostsFeed(), name='index_feed'),
+    path('feed/atom/', feeds.AtomLatestPostsFeed(), name='index_atom'),
+    path(
+        'group/<slug:slug>/feed/',
+        feeds.GroupPostsFeed(),
+        name='group_feed'
+    ),
+    path(
+        'group/<slug:slug>/feed/atom/',
+        feeds.AtomGroupPostsFeed(),
+        name='group_atom'
+    ),
+    path(
+        'profile/<str:username>/feed/',
+        feeds.ProfilePostsFeed(),
+        name='profile_feed'
+    ),
+    path(
+        'profile/<str:username>/feed/atom/',
+        feeds.AtomProfilePostsFeed(),
+        name='profile_atom'
+    ),
 ]
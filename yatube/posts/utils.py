@@ -1,13 +1,176 @@
 from django.core.paginator import Paginator
 from django.conf import settings
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_bytes
+from django.utils.functional import cached_property
+from django.utils.http import (urlsafe_base64_decode,
+                               urlsafe_base64_encode)
+
+from .models import Post
+
+# Сколько соседних номеров страниц показывать вокруг текущей
+PAGE_WINDOW = 3
+
+# Направления курсора: следующая (более старые посты) и предыдущая страница
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+
+
+def feed_queryset():
+    """Общий запрос постов для лент и страницы поста.
+
+    Автор, группа и счётчик постов автора приходят одним запросом,
+    поэтому шаблоны не делают запросов на каждый пост.
+    """
+    return Post.objects.select_related('author', 'group').annotate(
+        author_posts_count=F('author__profile__posts_count'))
+
+
+class CursorPage:
+    """Страница курсорной (keyset) пагинации.
+
+    Ведёт себя как список постов, а вместо номеров страниц
+    хранит непрозрачные токены для ссылок «вперёд» и «назад».
+    Запрос выполняется при первом обращении к странице, так что
+    закэшированный шаблон ленты не трогает базу.
+    """
+    is_cursor = True
+
+    def __init__(self, post_list, cursor, per_page):
+        self._post_list = post_list
+        self._cursor = cursor
+        self._per_page = per_page
+
+    def __repr__(self):
+        return f'<CursorPage cursor={self._cursor!r}>'
+
+    @cached_property
+    def _page(self):
+        return fetch_cursor_page(
+            self._post_list, self._cursor, self._per_page)
+
+    @property
+    def object_list(self):
+        return self._page[0]
+
+    @property
+    def next_cursor(self):
+        return self._page[1]
+
+    @property
+    def previous_cursor(self):
+        return self._page[2]
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def encode_cursor(direction, post):
+    """Упаковывает позицию поста (pub_date, id) в токен для URL."""
+    raw = f'{direction}|{post.pub_date.isoformat()}|{post.pk}'
+    return urlsafe_base64_encode(force_bytes(raw))
+
+
+def decode_cursor(token):
+    """Распаковывает токен; для испорченного токена возвращает None."""
+    try:
+        direction, pub_date, pk = (
+            urlsafe_base64_decode(token).decode().split('|')
+        )
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (TypeError, ValueError):
+        return None
+    if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS) or pub_date is None:
+        return None
+    return direction, pub_date, pk
+
+
+def fetch_cursor_page(post_list, cursor, per_page):
+    """Выбирает страницу начиная с позиции курсора.
+
+    Вместо COUNT(*) и OFFSET выбирается на один пост больше страницы,
+    поэтому любая страница стоит как первая. Возвращает посты и токены
+    следующей и предыдущей страниц.
+    """
+    if cursor is None:
+        # Нет курсора или он испорчен - отдаём первую страницу
+        posts = list(post_list.order_by('-pub_date', '-pk')[:per_page + 1])
+        has_more, has_before = len(posts) > per_page, False
+    else:
+        direction, pub_date, pk = cursor
+        if direction == CURSOR_NEXT:
+            posts = list(post_list.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+            ).order_by('-pub_date', '-pk')[:per_page + 1])
+            has_more, has_before = len(posts) > per_page, True
+        else:
+            # Идём назад: выбираем в обратном порядке и разворачиваем
+            posts = list(post_list.filter(
+                Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk)
+            ).order_by('pub_date', 'pk')[:per_page + 1])
+            has_before = len(posts) > per_page
+            posts = posts[:per_page][::-1]
+            has_more = True
+    posts = posts[:per_page]
+    if not posts:
+        return posts, None, None
+    return (
+        posts,
+        encode_cursor(CURSOR_NEXT, posts[-1]) if has_more else None,
+        encode_cursor(CURSOR_PREVIOUS, posts[0]) if has_before else None,
+    )
+
+
+def paginate_cursor(request, post_list):
+    """Курсорная пагинация по ключу (pub_date, id)."""
+    cursor = decode_cursor(request.GET.get('cursor', ''))
+    return CursorPage(post_list, cursor, settings.POSTS_PER_PAGE)
 
 
 # Выносим Пагинацию отдельно
-def paginate_page(request, post_list):
-    """Функция пагинации постов"""
+def paginate_page(request, post_list, count=None):
+    """Функция пагинации постов.
+
+    count - функция, возвращающая число постов без COUNT(*) по post_list
+    (например, из кэша); нужна только при нумерованных страницах.
+    """
+    # В режиме 'cursor' страницы отдаются по курсору, без COUNT и OFFSET
+    if settings.POSTS_PAGINATION == 'cursor':
+        return paginate_cursor(request, post_list)
+    return paginate_numbered(request, post_list, count)
+
+
+def paginate_numbered(request, post_list, count=None):
+    """Пагинация по номерам страниц в порядке, заданном post_list."""
     # Показывать по 10 записей на странице.
     paginator = Paginator(post_list, settings.POSTS_PER_PAGE)
+    if count is not None:
+        paginator.count = count()
     # Из URL извлекаем номер запрошенной страницы - это значение параметра page
     page_number = request.GET.get("page")
     # Получаем и возвращаем набор записей для страницы с запрошенным номером
-    return paginator.get_page(page_number)
+    page = paginator.get_page(page_number)
+    # Ссылки только на соседние страницы: на больших лентах полный
+    # page_range - это тысячи ссылок на каждой странице
+    page.page_window = range(
+        max(page.number - PAGE_WINDOW, 1),
+        min(page.number + PAGE_WINDOW, paginator.num_pages) + 1,
+    )
+    return page
@@ -1,29 +1,48 @@
 from django.shortcuts import render, get_object_or_404
-from .models import Post, Group, User
+from .models import Follow, Post, Group, User
 from django.shortcuts import render, redirect
 from .forms import PostForm
 from django.contrib.auth.decorators import login_required
-from .utils import paginate_page
+from django.conf import settings
+from django.db import transaction
+from django.utils.http import urlencode
+from django.views.decorators.http import require_POST
+from .utils import feed_queryset, paginate_numbered, paginate_page
+from .search import search_posts
+from .timeline import timeline_posts
+from .conditional import (conditional_page, group_state, index_state,
+                          post_state, profile_state)
+from .feed_cache import (FEED_GROUP, FEED_INDEX, FEED_PROFILE,
+                         feed_count, get_feed_version)
 
 # Create your views here.
 
 
 # Главная страница
+@conditional_page(index_state)
 def index(request):
 
     # post_list = Post.objects.all().order_by('-pub_date')
     # Если порядок сортировки определен в классе Meta модели,
     # запрос будет выглядить так:
-    posts = Post.objects.select_related("group", "author")
+    posts = feed_queryset()
+    # Версия ленты - ключ закэшированного списка постов и их числа
+    feed_version = get_feed_version(FEED_INDEX)
     # вызов метода пагинации
-    page_obj = paginate_page(request, posts)
+    # Число постов считаем по самой таблице постов: с JOIN из
+    # feed_queryset() COUNT(*) шёл бы по подзапросу без индекса
+    page_obj = paginate_page(request, posts, count=lambda: feed_count(
+        FEED_INDEX, None, feed_version, Post.objects.all()))
     context = {
         'page_obj': page_obj,
+        'feed_version': feed_version,
+        'feed_cache_timeout': settings.FEED_CACHE_TIMEOUT,
     }
     return render(request, 'posts/index.html', context)
 
 
 # Страница с постами группы
+@conditional_page(group_state)
 def group_posts(request, slug):
 
     template = 'posts/group_list.html'
@@ -37,48 +56,85 @@ def group_posts(request, slug):
     # Это аналог добавления
     # условия WHERE group_id = {group_id}
     # posts = Post.objects.filter(group=group).order_by('-pub_date')[:10]
-    group_posts = group.posts.all()
-    page_obj = paginate_page(request, group_posts)
+    group_posts = feed_queryset().filter(group=group)
+    feed_version = get_feed_version(FEED_GROUP, group.pk)
+    page_obj = paginate_page(request, group_posts, count=lambda: feed_count(
+        FEED_GROUP, group.pk, feed_version,
+        Post.objects.filter(group=group)))
     context = {
         'page_obj': page_obj,
         'group': group,
+        'feed_version': feed_version,
+        'feed_cache_timeout': settings.FEED_CACHE_TIMEOUT,
     }
     return render(request, template, context)
 
 
 # Профиль пользователя
+@conditional_page(profile_state)
 def profile(request, username):
 
     template = 'posts/profile.html'
-    user_author = get_object_or_404(User, username=username)
+    # Профиль со счётчиком постов подтягиваем тем же запросом
+    user_author = get_object_or_404(
+        User.objects.select_related('profile'), username=username)
 
     # такая конструкция ниже тоже работает, но не проходит автотесты
     # user_posts = get_list_or_404(Post, author__username=username)
     # user_posts_count = user404.posts.select_related('author').count()
 
-    user_posts = user_author.posts.all()
-    page_obj = paginate_page(request, user_posts)
+    user_posts = feed_queryset().filter(author=user_author)
+    feed_version = get_feed_version(FEED_PROFILE, user_author.pk)
+    page_obj = paginate_page(request, user_posts, count=lambda: feed_count(
+        FEED_PROFILE, user_author.pk, feed_version,
+        Post.objects.filter(author=user_author)))
+    following = (
+        request.user.is_authenticated
+        and Follow.objects.filter(
+            user=request.user, author=user_author).exists()
+    )
     context = {
         'page_obj': page_obj,
         'user_author': user_author,
+        'following': following,
+        'feed_version': feed_version,
+        'feed_cache_timeout': settings.FEED_CACHE_TIMEOUT,
     }
     return render(request, template, context)
 
 
 # Посты пользователя
+@conditional_page(post_state)
 def post_detail(request, post_id):
 
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(feed_queryset(), id=post_id)
     context = {
         'post': post,
     }
     return render(request, template, context)
 
+
+# Поиск по тексту постов
+def search(request):
+
+    template = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+    # Выдача отсортирована по релевантности, а курсор пересортировал
+    # бы её по дате, поэтому страницы всегда нумерованные
+    page_obj = paginate_numbered(request, search_posts(query))
+    context = {
+        'page_obj': page_obj,
+        'query': query,
+        # Параметры запроса для ссылок паджинатора
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, template, context)
+
 # @login_required
 # def post_create(request):
 #     if request.method == 'POST':
-#         form = PostForm(request.POST or None)
+#         form = PostForm(request.POST or None, files=request.FILES or None)
 #         if form.is_valid():
 #             post = form.save(commit=False)
 #             post.author = request.user
@@ -91,7 +147,7 @@ def post_detail(request, post_id):
 @login_required
 def post_create(request):
 
-    form = PostForm(request.POST or None)
+    form = PostForm(request.POST or None, files=request.FILES or None)
 
     if not request.method == "POST":
         return render(
@@ -103,12 +159,14 @@ def post_create(request):
     if not form.is_valid():
         return render(
             request,
-            "posts/index.html",
+            "posts/create_post.html",
             {"form": form, "is_edit": False}
         )
     post = form.save(commit=False)
     post.author = request.user
-    post.save()
+    # Пост и счётчики автора и группы сохраняются одной транзакцией
+    with transaction.atomic():
+        post.save()
     return redirect("posts:profile", request.user)
 
 
@@ -117,9 +175,11 @@ def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     if post.author != request.user:
         return redirect('posts:post_detail', post_id)
-    form = PostForm(request.POST or None, instance=post)
+    form = PostForm(
+        request.POST or None, files=request.FILES or None, instance=post)
     if form.is_valid():
-        form.save()
+        with transaction.atomic():
+            form.save()
         return redirect("posts:post_detail", post_id)
     context = {
         "form": form,
@@ -127,3 +187,31 @@ def post_edit(request, post_id):
         "is_edit": True,
     }
     return render(request, 'posts/create_post.html', context)
+
+
+# Лента постов авторов, на которых подписан пользователь
+@login_required
+def follow_index(request):
+
+    page_obj = paginate_page(request, timeline_posts(request.user))
+    context = {
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/follow.html', context)
+
+
+@require_POST
+@login_required
+def profile_follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        Follow.objects.get_or_create(user=request.user, author=author)
+    return redirect('posts:profile', username)
+
+
+@require_POST
+@login_required
+def profile_unfollow(request, username):
+    Follow.objects.filter(
+        user=request.user, author__username=username).delete()
+    return redirect('posts:profile', username)
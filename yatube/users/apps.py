@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class UsersConfig(AppConfig):
     name = 'users'
+
+    def ready(self):
+        # Сброс закэшированного пользователя сессии при его изменении
+        from . import signals  # noqa: F401
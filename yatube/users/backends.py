@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+
+def user_cache_key(user_id):
+    return f'auth_user:{user_id}'
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, который берёт пользователя сессии из кэша.
+
+    Пользователь загружается на каждом запросе залогиненного
+    посетителя; из кэша он достаётся без SQL. Запись сбрасывается
+    при любом сохранении пользователя (users.signals), в том числе
+    при смене пароля - иначе сессия сверялась бы со старым хэшем.
+    """
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+        return user
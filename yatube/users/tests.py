@@ -1 +1,72 @@
-# Create your tests here.
+from unittest import skipIf
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.conf import settings
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+User = get_user_model()
+
+
+# Как при общем кэше (memcached и т.п.) в settings.py
+SHARED_CACHE_AUTH = {
+    'AUTHENTICATION_BACKENDS': ['users.backends.CachedModelBackend'],
+    'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db',
+}
+
+
+@skipIf(settings.CACHE_IS_SHARED, 'задан общий кэш')
+class LocalCacheAuthSettingsTest(TestCase):
+    def test_no_cached_auth_without_shared_cache(self):
+        """Без общего кэша сессии и пользователь читаются из базы"""
+        self.assertEqual(
+            settings.AUTHENTICATION_BACKENDS,
+            ['django.contrib.auth.backends.ModelBackend'])
+        self.assertNotEqual(
+            settings.SESSION_ENGINE,
+            'django.contrib.sessions.backends.cached_db')
+
+
+@override_settings(**SHARED_CACHE_AUTH)
+class AuthQueriesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='reader', password='old-secret-42')
+
+    def auth_queries(self, client):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse('posts:index'))
+        self.assertEqual(response.status_code, 200)
+        return [
+            query['sql'] for query in queries
+            if 'FROM "django_session"' in query['sql']
+            or 'FROM "auth_user"' in query['sql']
+        ]
+
+    def test_anonymous_request_skips_session(self):
+        self.assertEqual(self.auth_queries(self.client), [])
+
+    def test_logged_in_feed_has_no_auth_sql(self):
+        self.client.force_login(self.user)
+        self.auth_queries(self.client)
+        self.assertEqual(self.auth_queries(self.client), [])
+
+    def test_password_change_drops_cached_user(self):
+        other = Client()
+        other.force_login(self.user)
+        self.client.force_login(self.user)
+        self.auth_queries(other)
+        response = self.client.post(reverse('users:password_change'), {
+            'old_password': 'old-secret-42',
+            'new_password1': 'new-secret-42',
+            'new_password2': 'new-secret-42',
+        })
+        self.assertEqual(response.status_code, 302)
+        # Сменивший пароль остаётся в системе, другие сессии - нет
+        response = self.client.get(reverse('posts:index'))
+        self.assertTrue(response.wsgi_request.user.is_authenticated)
+        response = other.get(reverse('posts:index'))
+        self.assertFalse(response.wsgi_request.user.is_authenticated)
@@ -0,0 +1,151 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+Django 2.2 has no ASGI handler and no async views, so the WSGI application
+is run in a thread pool. The ASGI server keeps slow and keep-alive
+connections on its event loop: a thread is taken only while Django builds
+and streams the response, not while the client sends the request body.
+
+    uvicorn yatube.asgi:application --workers 2
+"""
+
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+from core.warmup import warm_up
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+wsgi_application = get_wsgi_application()
+
+if settings.TEMPLATES_WARMUP:
+    warm_up()
+
+# Потоки, в которых выполняется Django; соединений может быть намного больше.
+# У каждого потока своё соединение с базой, так что их не больше DB_POOL_SIZE
+executor = ThreadPoolExecutor(
+    max_workers=settings.DB_POOL_SIZE,
+    thread_name_prefix='yatube-asgi',
+)
+
+
+def build_environ(scope, body):
+    """Окружение WSGI (PEP 3333) из HTTP-scope ASGI."""
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_LENGTH':
+            environ['CONTENT_LENGTH'] = value
+        elif name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        else:
+            key = f'HTTP_{name}'
+            if key in environ:
+                # Повторные заголовки склеиваются через запятую, а
+                # несколько Cookie - как одна строка cookie
+                separator = '; ' if key == 'HTTP_COOKIE' else ','
+                value = f'{environ[key]}{separator}{value}'
+            environ[key] = value
+    return environ
+
+
+def run_wsgi(environ, loop, send):
+    """Выполняет запрос в Django целиком в одном потоке пула.
+
+    Соединение с базой у Django своё у каждого потока, поэтому тело
+    потокового ответа (курсор выгрузки постов) читается и закрывается
+    в том же потоке, где ответ начали строить. Части тела уходят в
+    цикл событий по мере готовности: поток ждёт, пока часть отправится,
+    и не копит ответ в памяти.
+    """
+    def send_message(message):
+        asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started['status'] = int(status.split(' ', 1)[0])
+        started['headers'] = [
+            (name.lower().encode('latin-1'), value.encode('latin-1'))
+            for name, value in headers
+        ]
+
+    result = wsgi_application(environ, start_response)
+    try:
+        send_message({
+            'type': 'http.response.start',
+            'status': started['status'],
+            'headers': started['headers'],
+        })
+        for chunk in result:
+            if chunk:
+                send_message({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                })
+    finally:
+        # close() шлёт request_finished: Django закрывает соединения
+        # этого потока
+        if hasattr(result, 'close'):
+            result.close()
+    send_message({'type': 'http.response.body', 'body': b''})
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        raise ValueError(f'Неподдерживаемый тип соединения: {scope["type"]}')
+
+    # Тело запроса читаем в цикле событий: медленный клиент не держит поток
+    body = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+        body.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(
+        executor, run_wsgi, build_environ(scope, b''.join(body)), loop, send)
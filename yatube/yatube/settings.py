@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -22,8 +23,11 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = 'kwo-n_0g2nn4(#c*uj&)=^x@3$py17$#c*an3a*@!jv=*f1!+q'
 
+# Профиль настроек: 'development' или 'production'
+PROFILE = os.environ.get('YATUBE_PROFILE', 'development')
+
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = PROFILE != 'production'
 # Указание настроек для работы программного клиента (для тестирования)
 ALLOWED_HOSTS = [
     'localhost',
@@ -49,8 +53,21 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
 ]
+# Облегчённый запуск публичных веб-воркеров: без админки, которая им
+# не нужна, а на старте импортирует много модулей. Админку обслуживают
+# отдельные воркеры без этого флага
+LEAN_BOOT = os.environ.get('YATUBE_LEAN_BOOT') == '1'
+if LEAN_BOOT:
+    INSTALLED_APPS.remove('django.contrib.admin')
 
 MIDDLEWARE = [
+    # Статика отдаётся до всего остального и в замеры не попадает
+    'core.middleware.StaticFilesMiddleware',
+    # Первым, чтобы в замеры попали и запросы остальных middleware
+    'core.middleware.TimingMiddleware',
+    'core.middleware.MetricsMiddleware',
+    # До сессий: их чтение и запись тоже идут через роутер реплик
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -59,7 +76,87 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
+# Доля запросов, для которых TimingMiddleware пишет замеры SQL и шаблонов
+# (медленные запросы пишутся всегда)
+REQUEST_TIMING_SAMPLE_RATE = float(
+    os.environ.get('YATUBE_TIMING_SAMPLE_RATE', 0.01))
+# Замерять ли время шаблонов. Для этого Template._render оборачивается
+# во всём процессе, поэтому по умолчанию только при разработке
+REQUEST_TIMING_TEMPLATES = DEBUG
+# Запросы дольше этого (мс) пишутся в лог вместе со списком SQL
+REQUEST_TIMING_SLOW_MS = 500
+# Каталог, куда каждый процесс сбрасывает свои метрики для /metrics.
+# Должен быть общим для всех воркеров одного сервера
+METRICS_DIR = os.environ.get(
+    'YATUBE_METRICS_DIR',
+    os.path.join(tempfile.gettempdir(), 'yatube-metrics'))
+# Как часто (в секундах) процесс сбрасывает метрики в файл
+METRICS_FLUSH_INTERVAL = 1
 POSTS_PER_PAGE = 10
+# Режим пагинации лент: 'page' - номера страниц, 'cursor' - курсор по
+# (pub_date, id) без COUNT(*) и OFFSET, глубокие страницы стоят как первая
+POSTS_PAGINATION = 'page'
+# Кэш. LocMemCache свой у каждого процесса; сайту из нескольких
+# процессов (воркеры сервера и очереди) нужен общий, например
+# YATUBE_CACHE_BACKEND=django.core.cache.backends.memcached.MemcachedCache
+# и YATUBE_CACHE_LOCATION=127.0.0.1:11211
+CACHE_BACKEND = os.environ.get(
+    'YATUBE_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+CACHE_IS_SHARED = CACHE_BACKEND not in (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.environ.get('YATUBE_CACHE_LOCATION', ''),
+    },
+}
+# Кэш лент (posts/feed_cache.py): версии лент и отрисованные списки.
+# Версию меняет процесс, сохранивший пост, или воркер очереди; в чужом
+# локальном кэше она останется старой. Поэтому без общего кэша ленты
+# не кэшируются совсем
+CACHES['feeds'] = CACHES['default'] if CACHE_IS_SHARED else {
+    'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+}
+# С общим кэшем пользователь сессии берётся из него; запись
+# сбрасывается при сохранении пользователя. В локальном кэше сброс
+# дошёл бы только до одного процесса, и после смены пароля или
+# блокировки другие продолжали бы пускать пользователя - поэтому без
+# общего кэша работает обычный ModelBackend. Смена бэкенда разлогинивает
+# все сессии: в них записан путь бэкенда
+AUTHENTICATION_BACKENDS = [
+    'users.backends.CachedModelBackend' if CACHE_IS_SHARED
+    else 'django.contrib.auth.backends.ModelBackend'
+]
+AUTH_USER_CACHE_TIMEOUT = 60 * 5
+# Сессии читаются из общего кэша, в базу - только при изменении; без
+# общего кэша - из базы, иначе выход из системы виден одному процессу.
+# Без базы совсем: 'django.contrib.sessions.backends.signed_cookies'
+SESSION_ENGINE = os.environ.get(
+    'YATUBE_SESSION_ENGINE',
+    'django.contrib.sessions.backends.cached_db' if CACHE_IS_SHARED
+    else 'django.contrib.sessions.backends.db')
+# Сколько хранить отрисованный список постов ленты. Устаревание
+# определяется версией ленты, так что срок может быть большим
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+# Посты авторов, у которых подписчиков больше этого, не раскладываются
+# по лентам подписок при записи, а подмешиваются к ним при чтении
+TIMELINE_FANOUT_LIMIT = 10_000
+# Сколько последних постов автора попадает в ленту нового подписчика
+TIMELINE_BACKFILL = 50
+# Очередь задач (core/jobs.py). При JOBS_EAGER задачи выполняются
+# сразу при постановке, без воркера
+JOBS_EAGER = False
+JOBS_MAX_ATTEMPTS = 5
+# Пауза перед первым повтором (с); дальше она удваивается
+JOBS_RETRY_DELAY = 10
+# Через сколько секунд задачу упавшего воркера возьмёт другой
+JOBS_LOCK_TIMEOUT = 5 * 60
+# Сколько дней хранить выполненные задачи (и их ключи)
+JOBS_KEEP_DONE_DAYS = 7
+# Срок хранения карточки поста; ключ меняется при правке поста
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24 * 7
 ROOT_URLCONF = 'yatube.urls'
 # Путь к директории с шаблонами вынесен в переменную:
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
@@ -81,6 +178,18 @@ TEMPLATES = [
     },
 ]
 
+if PROFILE == 'production':
+    # Шаблон разбирается один раз за жизнь процесса
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+# Разбирать шаблоны из DIRS при старте воркера (core.warmup)
+TEMPLATES_WARMUP = PROFILE == 'production'
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
@@ -90,9 +199,53 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'NAME': os.environ.get(
+            'YATUBE_DB_PATH', os.path.join(BASE_DIR, 'db.sqlite3')),
     }
 }
+# PRAGMA, которые core.db выполняет на каждом новом соединении SQLite
+SQLITE_PRAGMAS = {}
+# Сколько потоков одного процесса работают с базой (и держат по
+# соединению). yatube.asgi запускает Django в пуле такого размера
+DB_POOL_SIZE = int(os.environ.get('YATUBE_DB_POOL_SIZE', 8))
+
+if PROFILE == 'production':
+    # Соединение потока живёт между запросами, а не открывается заново.
+    # Потоков не больше DB_POOL_SIZE, поэтому и соединений не больше
+    DATABASES['default']['CONN_MAX_AGE'] = 600
+    # Сколько секунд ждать блокировки записи, прежде чем упасть
+    DATABASES['default']['OPTIONS'] = {'timeout': 20}
+    SQLITE_PRAGMAS = {
+        # Читатели не ждут пишущего и не мешают ему
+        'journal_mode': 'WAL',
+        # В режиме WAL fsync только при контрольной точке
+        'synchronous': 'NORMAL',
+        'busy_timeout': 20_000,
+        'mmap_size': 256 * 1024 * 1024,
+        # Отрицательное значение - размер кэша страниц в КиБ
+        'cache_size': -64 * 1024,
+        'temp_store': 'MEMORY',
+    }
+
+# Реплики только для чтения - псевдонимы из DATABASES. Пока список пуст,
+# все запросы идут в default. Локально реплики - копии файла базы,
+# которые обновляет команда replicate_db
+DATABASE_REPLICAS = []
+for number, path in enumerate(filter(None, os.environ.get(
+        'YATUBE_REPLICA_DB_PATHS', '').split(os.pathsep)), 1):
+    alias = f'replica{number}'
+    DATABASES[alias] = dict(
+        DATABASES['default'], NAME=path, TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['core.db.ReplicaRouter']
+# Сколько секунд после записи клиент читает из основной базы. Должно
+# быть больше отставания реплик. Через столько же воркер очереди ещё раз
+# меняет версии лент - это доходит до веб-процессов только через общий
+# кэш (CACHE_IS_SHARED)
+REPLICA_STICKY_SECONDS = 10
+REPLICA_STICKY_COOKIE = 'use_primary'
+# Запросы к этим путям читают из основной базы
+REPLICA_PRIMARY_PATHS = ['/admin/']
 
 
 # Password validation
@@ -132,6 +285,24 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
 STATIC_URL = '/static/'
+# Куда collectstatic собирает статику; оттуда её отдаёт
+# core.middleware.StaticFilesMiddleware, когда DEBUG выключен
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+if PROFILE == 'production':
+    # Имена с хэшем содержимого и готовые .gz и .br
+    STATICFILES_STORAGE = (
+        'core.staticfiles.CompressedManifestStaticFilesStorage')
+
+# Картинки постов и их миниатюры. Имена миниатюр - хэш содержимого,
+# поэтому MEDIA_URL/thumbs/ можно отдавать с бессрочным кэшированием
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+MEDIA_URL = '/media/'
+# Размеры миниатюр (ширина, высота), в которые вписывается картинка
+POST_THUMBNAIL_SIZES = {
+    'feed': (640, 640),
+    'detail': (1280, 1280),
+}
+POST_THUMBNAIL_QUALITY = 85
 
 # Подключаем движок filebased.EmailBackend -
 # эмуляция почтового сервера, сохраняет текст отправленных
@@ -140,3 +311,27 @@ STATIC_URL = '/static/'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 # указываем директорию, в которую складываются файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+
+# Замеры запросов: медленные пишутся всегда, строка на каждый
+# запрос - если понизить уровень core.timing до INFO
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.warmup': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'core.timing': {
+            'handlers': ['console'],
+            'level': os.environ.get('YATUBE_TIMING_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
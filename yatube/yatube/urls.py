@@ -14,16 +14,28 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
+from django.apps import apps
+from django.conf import settings
+from django.conf.urls.static import static
 from django.urls import path, include
 
+from core import views as core_views
+
 urlpatterns = [
     # импорт правил из приложения posts
     path('', include('posts.urls', namespace='posts')),
-    path('admin/', admin.site.urls),
     path('group/<slug:slug>/', include('posts.urls', namespace='posts')),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('accounts/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    # Метрики для Prometheus
+    path('metrics', core_views.metrics, name='metrics'),
 ]
+# Без админки (LEAN_BOOT) её модули не импортируются вовсе
+if apps.is_installed('django.contrib.admin'):
+    from django.contrib import admin
+    urlpatterns.append(path('admin/', admin.site.urls))
+
+# Картинки постов в режиме разработки; в бою их отдаёт веб-сервер
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)